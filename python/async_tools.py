@@ -0,0 +1,135 @@
+'''Asyncio tools. Python 3 only.'''
+
+from __future__ import print_function
+
+import asyncio
+import inspect
+import threading
+
+from cli_tools import Timer, _clock
+
+
+class AsyncTimer(Timer):
+    '''Timer for functions returning awaitables, like async def coroutine functions. Many can run
+    concurrently in one event loop, so I/O bound polls (ie. checking files, pinging local services)
+    don't need a thread each. Same results, run_times, stop_on_result and final_result as Timer.
+
+    >>> async def ping():
+            reader, writer = await asyncio.open_connection('localhost', 8000)
+            writer.close()
+            return True
+    >>> run_timers([AsyncTimer(ping, 5, timeout=2), AsyncTimer(check_files, 60)])
+
+    Special kwargs (not passed to func), on top of Timer's:
+        timeout (float or None): Cancel call if it takes longer than this many seconds. Timed out
+            calls have no result and are counted in timeouts.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        self.timeout = kwargs.pop('timeout', None)
+        super(AsyncTimer, self).__init__(*args, **kwargs)
+        self.timeouts = 0
+        self._task = None
+
+    def run(self):
+        '''Call function on schedule in new event loop until stopped. Can cancel with Ctrl+C.'''
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        '''Call function on schedule in running event loop until stopped or cancelled.'''
+        self._task = asyncio.current_task()
+        due = _clock()
+        try:
+            while not self.stopped:
+                await asyncio.sleep(max(due - _clock(), 0))
+                due = await self._call_async(due)
+                if due is None:
+                    break
+        except asyncio.CancelledError:
+            if not self.stopped:
+                # Cancelled from outside, not by stop().
+                raise
+        finally:
+            self._task = None
+
+    def stop(self):
+        '''Stop calling function. Cancels call in progress.'''
+        self.stopped = True
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _call_async(self, due):
+        '''Await function call once, due at clock time due. Returns clock time next call is due,
+        or None if stopping.
+        '''
+        start = self._start_call(due)
+        res = self.func(*self.args, **self.kwargs)
+        if inspect.isawaitable(res):
+            try:
+                res = await asyncio.wait_for(res, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return self._finish_call(due, start, None, timed_out=True)
+        return self._finish_call(due, start, res)
+
+
+async def run_timers_async(timers):
+    '''Run AsyncTimers concurrently in running event loop until all are stopped.'''
+    await asyncio.gather(*(timer.run_async() for timer in timers))
+
+
+def run_timers(timers):
+    '''Run AsyncTimers concurrently in new event loop until all are stopped. Can cancel with
+    Ctrl+C.
+    '''
+    asyncio.run(run_timers_async(timers))
+
+
+class AsyncExecutor(object):
+    '''Runs async functions in event loop in a background thread, like concurrent.futures
+    executors do in threads. Lets sync code (ie. smart_loop(executor='async')) run many I/O bound
+    coroutines concurrently.
+
+    >>> executor = AsyncExecutor()
+    >>> future = executor.submit(fetch, url)  # concurrent.futures.Future
+    >>> future.result()
+    >>> executor.shutdown()
+    '''
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        '''Schedule func(*args, **kwargs) in event loop. Returns concurrent.futures.Future of
+        result, awaited if awaitable. Cancelling future cancels call.
+        '''
+        return asyncio.run_coroutine_threadsafe(_call(func, args, kwargs), self._loop)
+
+    def shutdown(self, wait=True):
+        '''Cancel calls still running and stop event loop. Waits for loop to stop if wait.'''
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(_cancel_tasks(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if wait:
+            self._thread.join()
+            self._loop.close()
+
+
+async def _call(func, args, kwargs):
+    '''Call func, awaiting result if awaitable.'''
+    res = func(*args, **kwargs)
+    if inspect.isawaitable(res):
+        res = await res
+    return res
+
+
+async def _cancel_tasks():
+    '''Cancel all other tasks in running loop and wait for them to finish.'''
+    tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -2,13 +2,20 @@
 
 from __future__ import print_function
 
+import heapq
+import itertools
 import os
 import pprint
 import re
 import sys
+import threading
 import time
+import traceback
+
+from collections import OrderedDict, defaultdict, deque
 
 from lancore import var_name, human_int, human_time, my_timestamp
+from json_tools import iter_json_events
 from my_logging import info
 from os_tools import walk_dir
 from python_compatibility import get_input, is_string
@@ -17,7 +24,9 @@ from python_compatibility import get_input, is_string
 INIT_PY = '__init__.py'
 
 
-def find(haystack, needle, all=False, first=False, ignore_case=True, max_results=50):
+def find(
+        haystack, needle, all=False, first=False, ignore_case=True, max_results=50, sort=False,
+        workers=None):
     '''Prints path to needle in iterable haystack (can be nested list, dict, os.environ, set, or
     tuple).
 
@@ -70,91 +79,380 @@ def find(haystack, needle, all=False, first=False, ignore_case=True, max_results
 
     Args:
         haystack (list, dict, set, or tuple): Nested list, dict, set, or tuple.
-        needle (anything): Target to find.
+        needle (anything): Target to find. Can also be compiled regex, InRange, or function
+            returning True for matching items. See _matcher().
         all (bool): Shows all results if True. Up to max_results otherwise.
         first (bool): Returns first result if True. All results otherwise.
         ignore_case (bool): Case-insensitive if True.
         max_results (int): Max number of results to return. Unlimited if negative or zero.
+        sort (bool): Search dicts in sorted key order if True. Insertion order otherwise (faster).
+        workers (int or None): Number of processes to split top-level list/dict between. Useful
+            for millions of records. Searches in this process if None or if fewer than
+            PARALLEL_FIND_MIN_ITEMS top-level items. Needle must be picklable.
     '''
     info('Searching...')
-    all_ = all
-    results = _find(haystack, needle, first, ignore_case)
-    if not results:
+    limit = _results_limit(all, first, max_results)
+    results = _iter_find_results(haystack, needle, ignore_case, sort, workers, limit)
+    _print_results(results, var_name(haystack), first, limit)
+
+
+def find_in_json_file(
+        file_path, needle, all=False, first=False, ignore_case=True, max_results=50):
+    '''Prints path to needle in JSON file, like find(), without loading whole file into memory.
+
+    Useful for multi-GB JSON dumps and logs. Values of matching keys are printed as {...} or [...]
+    if they're objects or arrays.
+
+    >>> find_in_json_file('fruits.json', 'lemon')
+    INFO: Searching...
+    ['fruits'][2]['name']: lemon
+    INFO: Found 1 result
+
+    Args:
+        file_path (str): Path to .json file.
+        Rest are same as find().
+    '''
+    info('Searching {}...'.format(file_path))
+    results = iter_find_in_json_file(file_path, needle, ignore_case=ignore_case)
+    _print_results(results, '', first, _results_limit(all, first, max_results))
+
+
+def _results_limit(all_, first, max_results):
+    '''Max number of results to print. None if unlimited.'''
+    if first:
+        return 1
+    elif not all_ and max_results > 0:
+        return max_results
+    return None
+
+
+def _print_results(results, name, first, limit):
+    '''Prints (path, value) results of find() up to limit. Stops results iterator when done.'''
+    # Stop searching as soon as limit is reached, instead of collecting every result first.
+    num_results = 0
+    for path, value in results:
+        if limit is not None and num_results >= limit:
+            # Max number of results reached.
+            results.close()
+            print('Displayed first %i results...' % limit)
+            info('Found more than %s results' % human_int(num_results))
+            return
+        # Print path to value and value itself.
+        print('%s%s:' % (name, _format_path(path)), end=' ')
+        print(value)
+        num_results += 1
+        if first:
+            results.close()
+            return
+
+    if not num_results:
         info('Not found')
         return
-    for index, result in enumerate(results):
-        if not all_ and index >= max_results > 0:
-            # Max number of results reached.
-            print('Displayed first %i results...' % max_results)
-            break
+    info('Found %s result%s' % (human_int(num_results), 's' if num_results > 1 else ''))
 
-        # Print path to value and value itself.
-        path = ''
-        for attr in result:
-            if is_string(attr):
-                path += "['%s']" % attr
-            else:
-                path += '[%s]' % attr
-        print('%s%s:' % (var_name(haystack), path), end=' ')
-        print(eval('haystack%s' % path))
-    num_results = len(results)
-    if not first:
-        info('Found %s result%s' % (human_int(num_results), 's' if num_results > 1 else ''))
 
+def iter_find(haystack, needle, ignore_case=True, sort=False, workers=None):
+    '''Yields path to every needle in haystack lazily, as list of keys. See find().
 
-def _find(haystack, needle, first, ignore_case):
-    '''Recursive helper for find().'''
-    results = []
+    >>> next(iter_find({'fruits': [{'name': 'lemon'}]}, 'lemon'))
+    ['fruits', 0, 'name']
+    '''
+    for path, _ in _iter_find_results(haystack, needle, ignore_case, sort, workers, None):
+        yield path
+
+
+def _iter_find_results(haystack, needle, ignore_case, sort, workers, limit):
+    '''Yields (path, value) of matches from _iter_find() or _iter_find_parallel().'''
+    if (workers and workers > 1 and isinstance(haystack, (dict, os._Environ, list, tuple)) and
+            len(haystack) >= PARALLEL_FIND_MIN_ITEMS):
+        return _iter_find_parallel(haystack, needle, ignore_case, sort, workers, limit)
+    return _iter_find(haystack, needle, ignore_case=ignore_case, sort=sort)
+
+
+# Number of chunks per process top-level container is split into by _iter_find_parallel().
+# More chunks balance uneven records better. Fewer chunks have less overhead.
+CHUNKS_PER_WORKER = 4
+# Min number of top-level items to search in parallel. Smaller containers are searched in this
+# process, since pickling chunks to workers costs more than searching them.
+PARALLEL_FIND_MIN_ITEMS = 10000
+
+
+def _iter_find_parallel(haystack, needle, ignore_case, sort, workers, limit):
+    '''Splits top-level dict/list into chunks and searches them in long-lived process pool of
+    multiprocessing_tools.get_pool(), so processes are only started on first call. Yields
+    (path, value) of matches in same order as _iter_find().
+
+    Uses ordered multiprocessing_tools.iter_func(), so results of earlier chunks are yielded while
+    later chunks are still being searched. Chunks not started yet are cancelled as soon as caller
+    stops iterating.
+
+    Args:
+        limit (int or None): Max number of results per chunk. Unlimited if None.
+    '''
     if isinstance(haystack, (dict, os._Environ)):
-        iterable = sorted(haystack.items())
-    elif isinstance(haystack, (list, tuple, set)):
-        iterable = enumerate(haystack)
+        items = sorted(haystack.items()) if sort else list(haystack.items())
+        is_dict = True
     else:
-        # Not sure how to iterate or if iterable.
-        return results
+        items = haystack
+        is_dict = False
+    chunk_size = max(len(items) // (workers * CHUNKS_PER_WORKER), 1)
+    chunks = (
+        (items[start:start + chunk_size], start, is_dict, needle, ignore_case, sort, limit)
+        for start in range(0, len(items), chunk_size))
+
+    from multiprocessing_tools import iter_func
+    for results in iter_func(_find_in_chunk, chunks, processes=workers, ordered=True):
+        for result in results:
+            yield result
+
+
+def _find_in_chunk(args):
+    '''Worker for _iter_find_parallel(). List of (path, value) of matches in chunk of top-level
+    items, with paths from top-level.
+    '''
+    chunk, start, is_dict, needle, ignore_case, sort, limit = args
+    container = dict(chunk) if is_dict else chunk
+    results = []
+    for path, value in _iter_find(container, needle, ignore_case=ignore_case, sort=sort):
+        if not is_dict:
+            # Offset index by where chunk starts in top-level list.
+            path[0] += start
+        results.append((path, value))
+        if limit is not None and len(results) >= limit:
+            break
+    return results
 
-    for key, val in iterable:
-        # Check both key and val.
-        for item in [key, val]:
-            if isinstance(item, (dict, list, tuple, set)):
-                # It's iterable. Check recursively.
-                recursive_results = _find(item, needle, first, ignore_case)
-                if recursive_results:
-                    results.extend([[key] + res for res in recursive_results])
-                    if first:
-                        return results
-                    if item == key:
-                        break
-            elif item == needle:
-                # Found exact match.
-                results.append([key])
-                if first:
-                    return results
-                if item == key:
-                    break
-            elif item:
-                # Check if in text.
-                if is_string(item) and is_string(needle):
-                    if ignore_case:
-                        if needle.lower() in item.lower():
-                            # Is text and in item, case-insensitive.
-                            results.append([key])
-                            if first:
-                                return results
-                            if item == key:
-                                break
-                    else:
-                        if needle in item:
-                            # Is text and in item, case-sensitive.
-                            results.append([key])
-                            if first:
-                                return results
-                            if item == key:
-                                break
 
+def _find(haystack, needle, first, ignore_case):
+    '''List of paths to needle in haystack, searched in sorted order. Only first one if first.'''
+    results = []
+    for path in iter_find(haystack, needle, ignore_case=ignore_case, sort=True):
+        results.append(path)
+        if first:
+            break
     return results
 
 
+def iter_find_in_json_file(file_path, needle, ignore_case=True):
+    '''Yields (path, value) of every needle in JSON file, parsing it incrementally. Same paths as
+    iter_find(). Values of matching keys are "{...}" or "[...]" if they're objects or arrays.
+    '''
+    is_match = _matcher(needle, ignore_case)
+    path = []  # Keys of open containers. Index in array.
+    in_array = []  # True for each open array. False for objects.
+    key_match = None  # Path of matching key, waiting for its value.
+    skip_depth = 0  # Depth inside value of matching key, which isn't searched.
+
+    for event, value in iter_json_events(file_path):
+        if skip_depth:
+            if event in ('start_map', 'start_array'):
+                skip_depth += 1
+            elif event in ('end_map', 'end_array'):
+                skip_depth -= 1
+            continue
+
+        if event == 'map_key':
+            path[-1] = value
+            if is_match(value):
+                key_match = list(path)
+            continue
+        if event in ('end_map', 'end_array'):
+            path.pop()
+            in_array.pop()
+            continue
+
+        # Value or start of container.
+        if in_array and in_array[-1]:
+            path[-1] += 1
+        if key_match is not None:
+            if event == 'value':
+                yield key_match, value
+            else:
+                yield key_match, '{...}' if event == 'start_map' else '[...]'
+                skip_depth = 1
+            key_match = None
+        elif event == 'value':
+            if path and is_match(value):
+                yield list(path), value
+        else:
+            is_array = event == 'start_array'
+            path.append(-1 if is_array else None)
+            in_array.append(is_array)
+
+
+# Types find() searches inside of.
+_SEARCHABLE_TYPES = (dict, os._Environ, list, tuple, set)
+
+
+def _iter_find(haystack, needle, ignore_case=True, sort=False):
+    '''Engine for find(). Yields (path, value) of every match, depth-first.
+
+    Uses an explicit stack of iterators instead of recursion, so deeply nested data can't hit the
+    recursion limit. Paths are linked (parent, key) nodes sharing their prefixes, and are only
+    copied into a list when a match is yielded.
+
+    Both dict keys and values are checked. If key matches, its value is not searched. Sets can't be
+    indexed, so a match inside a set yields the path to the set itself.
+    '''
+    if not isinstance(haystack, _SEARCHABLE_TYPES):
+        # Not sure how to iterate or if iterable.
+        return
+    is_match = _matcher(needle, ignore_case)
+
+    stack = [(None, haystack, _iter_items(haystack, sort))]
+    while stack:
+        node, container, items = stack[-1]
+        if isinstance(container, set):
+            for item in container:
+                if is_match(item) or (
+                        isinstance(item, tuple) and any(_iter_find(item, needle, ignore_case))):
+                    yield _node_path(node), container
+                    break
+            stack.pop()
+            continue
+
+        # List and tuple indices aren't keys to match.
+        check_keys = isinstance(container, (dict, os._Environ))
+        for key, val in items:
+            child = (node, key)
+            if not check_keys:
+                pass
+            elif isinstance(key, tuple):
+                # Search tuple key.
+                found_in_key = False
+                for key_path, _ in _iter_find(key, needle, ignore_case, sort):
+                    found_in_key = True
+                    yield _node_path(child) + key_path, val
+                if found_in_key:
+                    continue
+            elif is_match(key):
+                yield _node_path(child), val
+                continue
+
+            if isinstance(val, _SEARCHABLE_TYPES):
+                # Search val next. Resume with rest of items after.
+                stack.append((child, val, _iter_items(val, sort)))
+                break
+            if is_match(val):
+                yield _node_path(child), val
+        else:
+            # Searched all items.
+            stack.pop()
+
+
+def _iter_items(container, sort):
+    '''Key-value iterator of dict, list, or tuple. Sorted dict items if sort.'''
+    if isinstance(container, (dict, os._Environ)):
+        return iter(sorted(container.items())) if sort else iter(container.items())
+    return enumerate(container)
+
+
+class InRange(object):
+    '''Needle for find() matching numbers between low and high, inclusive.
+
+    >>> find(haystack, InRange(2, 3))
+    ['fruits']['strawberry']['cost_per_lb']: 2.07
+    '''
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def __repr__(self):
+        return 'InRange({}, {})'.format(self.low, self.high)
+
+
+_REGEX_TYPE = type(re.compile(''))
+_NUMBER_TYPES = (int, float)
+
+
+def _casefold(text):
+    '''Casefold text for case-insensitive compare. Python 2 strings only have lower().'''
+    return text.casefold() if hasattr(text, 'casefold') else text.lower()
+
+
+def _matcher(needle, ignore_case):
+    '''Compiles needle once into function returning True if item matches it.
+
+    Needle can be:
+        str: Exact match or substring of string items. Case-insensitive if ignore_case.
+        compiled regex: Searched in string items.
+        InRange: Number items between low and high, inclusive.
+        function: Predicate called with every key and item. Errors count as no match.
+        anything else: Exact match.
+
+    Checks are dispatched by exact item type through a table, falling back to a default check.
+    '''
+    def equals(item):
+        return item == needle
+
+    def never(item):
+        return False
+
+    type_to_check = {}
+    default = equals
+    if is_string(needle):
+        if ignore_case:
+            needle_folded = _casefold(needle)
+
+            def contains(item):
+                return needle_folded in _casefold(item)
+        else:
+            def contains(item):
+                return needle in item
+
+        def default(item):
+            return item == needle or (bool(item) and is_string(item) and contains(item))
+
+        type_to_check[type(needle)] = contains
+    elif isinstance(needle, _REGEX_TYPE):
+        search = needle.search
+
+        def default(item):
+            return is_string(item) and search(item) is not None
+
+        type_to_check[str] = lambda item: search(item) is not None
+    elif isinstance(needle, InRange):
+        low, high = needle.low, needle.high
+
+        def in_range(item):
+            return low <= item <= high
+
+        def default(item):
+            return isinstance(item, _NUMBER_TYPES) and not isinstance(item, bool) and in_range(item)
+
+        type_to_check.update({int: in_range, float: in_range, bool: never})
+    elif callable(needle) and not isinstance(needle, type):
+        def default(item):
+            try:
+                return bool(needle(item))
+            except Exception:
+                return False
+    else:
+        type_to_check[type(needle)] = equals
+
+    get_check = type_to_check.get
+
+    def is_match(item):
+        return get_check(type(item), default)(item)
+    return is_match
+
+
+def _node_path(node):
+    '''List of keys from linked (parent, key) path node.'''
+    path = []
+    while node is not None:
+        node, key = node
+        path.append(key)
+    path.reverse()
+    return path
+
+
+def _format_path(path):
+    '''Path as square bracket keys (ie. "['fruits'][0]['color']").'''
+    return ''.join("['%s']" % key if is_string(key) else '[%s]' % (key,) for key in path)
+
+
 DEFAULT_DELIMITER = ' '
 
 
@@ -181,7 +479,7 @@ def get(data, *keys, **kwargs):
     Args:
         data (nested dict, list, or tuple): Data to get value from given keys.
         keys (list or str): Keys of path to value. Can also be string of keys separated by space
-            delimiter.
+            delimiter. See compile_path() for getting same path from many items.
 
     Kwargs:
         delimiter (str): Delimiter for when keys is string. Defaults to space.
@@ -191,14 +489,14 @@ def get(data, *keys, **kwargs):
     '''
     delimiter = kwargs.get('delimiter', DEFAULT_DELIMITER)
 
-    # Split keys up if keys is 1 string of delimited keys.
-    if len(keys) == 1 and keys[0] not in data and is_string(keys[0]):
-        keys = keys[0].split(delimiter)
+    # Delimited string is split and compiled once. See compile_path().
+    if len(keys) == 1 and is_string(keys[0]):
+        return compile_path(keys[0], delimiter=delimiter)(data)
 
     # Iterate keys to find value.
     for key in keys:
         # Convert key to int if data is list.
-        if isinstance(data, list):
+        if isinstance(data, (list, tuple)):
             try:
                 key = int(key)
             except ValueError:
@@ -211,6 +509,306 @@ def get(data, *keys, **kwargs):
     return data
 
 
+# Max number of compiled paths compile_path() keeps.
+COMPILED_PATHS_CACHE_SIZE = 1024
+_COMPILED_PATHS = OrderedDict()
+
+
+def compile_path(keys, delimiter=DEFAULT_DELIMITER):
+    '''Function getting value at keys in nested dict, list, or tuple. Same as get(), but keys are
+    only split and converted to int once. Use as key to sort by.
+
+    >>> get_color = compile_path('fruits 0 color')
+    >>> get_color(data)
+    'yellow'
+    >>> sorted(rows, key=compile_path('owner name'))
+
+    Last COMPILED_PATHS_CACHE_SIZE compiled paths are cached, so calling get() with same delimited
+    string again is fast too.
+
+    Args:
+        keys (str, list, or tuple): Keys of path to value. String is split by delimiter, unless
+            string itself is a key in data.
+        delimiter (str): Delimiter for when keys is string. Defaults to space.
+
+    Returns:
+        func(data): Returns value found or None.
+    '''
+    cache_key = (tuple(keys) if isinstance(keys, (list, tuple)) else keys, delimiter)
+    try:
+        accessor = _COMPILED_PATHS.pop(cache_key)
+    except KeyError:
+        accessor = _compile_path(cache_key[0], delimiter)
+        if len(_COMPILED_PATHS) >= COMPILED_PATHS_CACHE_SIZE:
+            # Remove least recently used.
+            _COMPILED_PATHS.popitem(last=False)
+    _COMPILED_PATHS[cache_key] = accessor
+    return accessor
+
+
+def _compile_path(keys, delimiter):
+    '''Helper for compile_path(). Not cached.'''
+    if isinstance(keys, tuple):
+        return _compile_keys(keys)
+    if not is_string(keys) or delimiter not in keys:
+        return _compile_keys((keys,))
+
+    # Try whole string as key first, like get().
+    get_whole = _compile_keys((keys,))
+    get_split = _compile_keys(tuple(keys.split(delimiter)))
+
+    def accessor(data):
+        if not isinstance(data, (list, tuple)) and keys in data:
+            return get_whole(data)
+        return get_split(data)
+    return accessor
+
+
+def _compile_keys(keys):
+    '''Function getting value at keys. Keys are converted to int ahead of time for lists.'''
+    steps = []
+    for key in keys:
+        try:
+            int_key = int(key)
+        except (TypeError, ValueError):
+            int_key = None
+        steps.append((key, int_key))
+
+    def accessor(data):
+        for key, int_key in steps:
+            if int_key is not None and isinstance(data, (list, tuple)):
+                key = int_key
+            try:
+                data = data[key]
+            except (KeyError, TypeError):
+                return
+        return data
+    return accessor
+
+
+class DataIndex(object):
+    '''Index of nested dict/list for repeated get() and find() queries on the same data.
+
+    Walks data once into a flat path to value table, so get() is a dict lookup, and an inverted
+    index of casefolded word tokens to paths, so substring find() only checks paths sharing tokens
+    with the needle. Tokens containing needle's tokens are looked up by shared substrings of up to
+    TOKEN_NGRAM letters, instead of checking every token.
+
+    >>> index = DataIndex(data)
+    >>> index.get('fruits 0 color')
+    'yellow'
+    >>> index.find('pepper')
+    [['vegetables', 0, 'name']]
+
+    Replace a subtree with set(). If data was changed in place, call invalidate() with path to
+    changed subtree. Only that subtree is re-indexed.
+    >>> index.set(['vegetables', 0, 'name'], 'red pepper')
+
+    Results of find() are in index order. Subtrees re-indexed later come last.
+    '''
+
+    _token_re = re.compile(r'\w+', re.UNICODE)
+    TOKEN_NGRAM = 3
+
+    def __init__(self, data, delimiter=DEFAULT_DELIMITER):
+        self.data = data
+        self.delimiter = delimiter
+        self._path_to_value = {}
+        self._path_to_order = {}
+        self._path_to_children = {}
+        self._token_to_paths = {}
+        self._ngram_to_tokens = defaultdict(set)
+        self._count = 0
+        self._index(())
+
+    def __repr__(self):
+        return 'DataIndex({} paths, {} tokens)'.format(
+            len(self._path_to_value), len(self._token_to_paths))
+
+    def __len__(self):
+        return len(self._path_to_value)
+
+    def get(self, *keys):
+        '''Same as get(), from index. Falls back to get() for ambiguous string keys.'''
+        if len(keys) == 1 and is_string(keys[0]) and (keys[0],) not in self._path_to_value:
+            keys = keys[0].split(self.delimiter)
+        path = tuple(keys)
+        if path in self._path_to_value:
+            return self._path_to_value[path]
+
+        # Keys from string are strings. Try digits as list indices.
+        int_path = tuple(int(key) if is_string(key) and key.isdigit() else key for key in path)
+        if int_path in self._path_to_value:
+            return self._path_to_value[int_path]
+        return get(self.data, *keys, delimiter=self.delimiter)
+
+    def find(self, needle, ignore_case=True):
+        '''List of paths to needle, like _find(). Only checks paths sharing tokens with string
+        needle. Checks all paths otherwise.
+        '''
+        is_match = _matcher(needle, ignore_case)
+        needle_tokens = self._tokens(needle) if is_string(needle) else None
+        if needle_tokens:
+            # Needle token must be part of a token in matching key/value.
+            candidates = None
+            for needle_token in needle_tokens:
+                paths = set()
+                for token in self._tokens_containing(needle_token):
+                    paths.update(self._token_to_paths[token])
+                candidates = paths if candidates is None else candidates & paths
+            # Skip paths of stale tokens from values changed in place.
+            candidates = sorted(
+                (path for path in candidates if path in self._path_to_order),
+                key=self._path_to_order.get)
+        else:
+            candidates = sorted(self._path_to_value, key=self._path_to_order.get)
+
+        results = []
+        key_matches = set()
+        for path in candidates:
+            if any(path[:i] in key_matches for i in range(1, len(path))):
+                # Key already matched. Don't search its value.
+                continue
+            value = self._path_to_value[path]
+            if self._is_key(path) and is_match(path[-1]):
+                key_matches.add(path)
+            elif isinstance(value, set):
+                if not any(is_match(item) for item in value):
+                    continue
+            elif isinstance(value, _SEARCHABLE_TYPES) or not is_match(value):
+                continue
+            results.append(list(path))
+        return results
+
+    def set(self, keys, value):
+        '''Replace value at path keys in data and re-index it.'''
+        keys = tuple(keys)
+        if not keys:
+            self.data = value
+        else:
+            self._path_to_value[keys[:-1]][keys[-1]] = value
+        self.invalidate(keys)
+
+    def invalidate(self, keys=()):
+        '''Re-index subtree at path keys, after it was changed in place. Re-index all if no keys.'''
+        keys = tuple(keys)
+        self._remove(keys)
+        self._index(keys)
+
+    def _is_key(self, path):
+        '''True if last key in path is a dict key.'''
+        return bool(path) and isinstance(self._path_to_value[path[:-1]], (dict, os._Environ))
+
+    def _tokens(self, text):
+        return set(self._token_re.findall(_casefold(text)))
+
+    def _ngrams(self, token, sizes=None):
+        '''Substrings of token up to TOKEN_NGRAM letters long, or of sizes.'''
+        sizes = range(1, self.TOKEN_NGRAM + 1) if sizes is None else sizes
+        return set(token[i:i + size] for size in sizes for i in range(len(token) - size + 1))
+
+    def _tokens_containing(self, needle_token):
+        '''Indexed tokens containing needle token, from tokens sharing its ngrams.'''
+        if len(needle_token) <= self.TOKEN_NGRAM:
+            return self._ngram_to_tokens.get(needle_token, ())
+        tokens = None
+        for ngram in self._ngrams(needle_token, [self.TOKEN_NGRAM]):
+            ngram_tokens = self._ngram_to_tokens.get(ngram)
+            if not ngram_tokens:
+                return ()
+            tokens = set(ngram_tokens) if tokens is None else tokens & ngram_tokens
+            if not tokens:
+                return ()
+        return [token for token in tokens if needle_token in token]
+
+    def _add_token(self, token, path):
+        token_paths = self._token_to_paths.get(token)
+        if token_paths is None:
+            token_paths = self._token_to_paths[token] = set()
+            for ngram in self._ngrams(token):
+                self._ngram_to_tokens[ngram].add(token)
+        token_paths.add(path)
+
+    def _remove_token(self, token, path):
+        token_paths = self._token_to_paths.get(token)
+        if token_paths is None:
+            return
+        token_paths.discard(path)
+        if not token_paths:
+            del self._token_to_paths[token]
+            for ngram in self._ngrams(token):
+                ngram_tokens = self._ngram_to_tokens[ngram]
+                ngram_tokens.discard(token)
+                if not ngram_tokens:
+                    del self._ngram_to_tokens[ngram]
+
+    def _path_tokens(self, path, value):
+        '''Tokens of dict key and string value or set items at path.'''
+        tokens = set()
+        if self._is_key(path) and is_string(path[-1]):
+            tokens.update(self._tokens(path[-1]))
+        if is_string(value):
+            tokens.update(self._tokens(value))
+        elif isinstance(value, set):
+            for item in value:
+                if is_string(item):
+                    tokens.update(self._tokens(item))
+        return tokens
+
+    def _index(self, path):
+        '''Add subtree at path to index, depth-first. Nothing to add if path was deleted.'''
+        if path:
+            try:
+                value = self._path_to_value[path[:-1]][path[-1]]
+            except (KeyError, IndexError, TypeError):
+                return
+        else:
+            value = self.data
+        if path[:-1] in self._path_to_children:
+            # New key from set() or invalidate() must be removed with parent.
+            self._path_to_children[path[:-1]].add(path)
+        stack = [(path, value)]
+        while stack:
+            path, value = stack.pop()
+            self._path_to_value[path] = value
+            self._path_to_order[path] = self._count
+            self._count += 1
+            for token in self._path_tokens(path, value):
+                self._add_token(token, path)
+
+            if isinstance(value, (dict, os._Environ)):
+                children = list(value.items())
+            elif isinstance(value, (list, tuple)):
+                children = list(enumerate(value))
+            else:
+                continue
+            self._path_to_children[path] = set(path + (key,) for key, _ in children)
+            for key, child in reversed(children):
+                stack.append((path + (key,), child))
+
+    def _remove(self, path):
+        '''Remove subtree at path from index.'''
+        if path not in self._path_to_value:
+            return
+        if path:
+            self._path_to_children.get(path[:-1], set()).discard(path)
+        paths = []
+        stack = [path]
+        while stack:
+            path = stack.pop()
+            paths.append(path)
+            stack.extend(self._path_to_children.get(path, []))
+
+        # Remove tokens before paths, since tokens of dict keys need parent.
+        for path in paths:
+            for token in self._path_tokens(path, self._path_to_value[path]):
+                self._remove_token(token, path)
+        for path in paths:
+            del self._path_to_value[path]
+            del self._path_to_order[path]
+            self._path_to_children.pop(path, None)
+
+
 def print_env_vars(filter_=''):
     '''Print os.environ. Able to filter by case-insensitive search. Split by semi-colon.'''
     count = 0
@@ -395,8 +993,8 @@ def choose_one(items):
     return None
 
 
-def diff_lists(apples, oranges):
-    '''Print difference between two dicts (apples vs. oranges).
+def diff_lists(apples, oranges, ordered=False):
+    '''Print difference between two lists (apples vs. oranges).
 
     Example:
     >>> diff_lists(['BMW', 'Toyota'], ['Mercedes', 'Toyota', 'Tesla'])
@@ -405,7 +1003,35 @@ def diff_lists(apples, oranges):
     Orange only (2):
         Mercedes
         Tesla
+
+    Ordered also shows where items were removed, added, or moved to. See list_diff_opcodes().
+    >>> diff_lists(
+            ['BMW', 'Toyota', 'Audi', 'Kia'], ['Toyota', 'Tesla', 'Kia', 'BMW'], ordered=True)
+    Moved apple[0] to orange[3]:
+        BMW
+    Apple only [2:3] (1):
+        Audi
+    Orange only [1:2] (1):
+        Tesla
     '''
+    if ordered:
+        for tag, apple_start, apple_end, orange_start, orange_end in list_diff_opcodes(
+                apples, oranges):
+            if tag == 'move':
+                print('Moved apple[{}] to orange[{}]:'.format(apple_start, orange_start))
+                items = apples[apple_start:apple_end]
+            elif tag == 'delete':
+                print('Apple only [{}:{}] ({}):'.format(
+                    apple_start, apple_end, apple_end - apple_start))
+                items = apples[apple_start:apple_end]
+            else:
+                print('Orange only [{}:{}] ({}):'.format(
+                    orange_start, orange_end, orange_end - orange_start))
+                items = oranges[orange_start:orange_end]
+            for item in items:
+                print('\t{}'.format(item))
+        return
+
     oranges_set = set(oranges)
     apple_only = [x for x in apples if x not in oranges_set]
     if apple_only:
@@ -421,6 +1047,171 @@ def diff_lists(apples, oranges):
             print('\t{}'.format(item))
 
 
+def list_diff_opcodes(apples, oranges, moves=True):
+    '''Shortest edit script turning apples into oranges, like difflib opcodes without "equal".
+
+    Uses Myers' diff algorithm with linear space (middle snake divide and conquer), so memory
+    stays O(N + M) and time is O((N + M) * D), where D is number of differences. Fast on long lists
+    with few changes.
+
+    >>> list_diff_opcodes(['a', 'b', 'c', 'd'], ['b', 'x', 'd', 'a'])
+    [('move', 0, 1, 3, 4), ('delete', 2, 3, 1, 1), ('insert', 3, 3, 1, 2)]
+
+    Args:
+        apples (list): Old list.
+        oranges (list): New list.
+        moves (bool): Pair removed items with same added items as moves if True.
+
+    Returns:
+        [(tag, apple_start, apple_end, orange_start, orange_end)]: Tag is "delete" for
+            apples[apple_start:apple_end] removed, "insert" for oranges[orange_start:orange_end]
+            added, or "move" for one item moved from apples[apple_start] to oranges[orange_start].
+            Sorted by apple position, then orange position.
+    '''
+    item_to_id = {}
+    a = _item_ids(apples, item_to_id)
+    b = _item_ids(oranges, item_to_id)
+
+    # Skip common prefix and suffix.
+    left, top = 0, 0
+    right, bottom = len(a), len(b)
+    while left < right and top < bottom and a[left] == b[top]:
+        left += 1
+        top += 1
+    while right > left and bottom > top and a[right - 1] == b[bottom - 1]:
+        right -= 1
+        bottom -= 1
+
+    # Deleted (apple index, orange position) and inserted (apple position, orange index).
+    deletes = []
+    inserts = []
+    points = []
+    if not _myers_path(a, b, left, top, right, bottom, points):
+        points = [(left, top)]
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        while x1 < x2 and y1 < y2 and a[x1] == b[y1]:
+            x1 += 1
+            y1 += 1
+        if x2 - x1 > y2 - y1:
+            deletes.append((x1, y1))
+        elif x2 - x1 < y2 - y1:
+            inserts.append((x1, y1))
+
+    opcodes = []
+    if moves:
+        # Pair deleted and inserted items with same value, in order.
+        id_to_deletes = defaultdict(list)
+        for x, y in reversed(deletes):
+            id_to_deletes[a[x]].append(x)
+        moved = set()
+        remaining_inserts = []
+        for x, y in inserts:
+            deleted = id_to_deletes.get(b[y])
+            if deleted:
+                apple_index = deleted.pop()
+                moved.add(apple_index)
+                opcodes.append(('move', apple_index, apple_index + 1, y, y + 1))
+            else:
+                remaining_inserts.append((x, y))
+        deletes = [(x, y) for x, y in deletes if x not in moved]
+        inserts = remaining_inserts
+
+    # Group runs into hunks.
+    for x, y in deletes:
+        if opcodes and opcodes[-1][0] == 'delete' and opcodes[-1][2] == x:
+            opcodes[-1] = ('delete', opcodes[-1][1], x + 1, y, y)
+        else:
+            opcodes.append(('delete', x, x + 1, y, y))
+    for x, y in inserts:
+        if opcodes and opcodes[-1][0] == 'insert' and opcodes[-1][4] == y:
+            opcodes[-1] = ('insert', x, x, opcodes[-1][3], y + 1)
+        else:
+            opcodes.append(('insert', x, x, y, y + 1))
+    opcodes.sort(key=lambda opcode: (opcode[1], opcode[3]))
+    return opcodes
+
+
+def _item_ids(items, item_to_id):
+    '''List of int ids of items, same id for equal items. Ints compare faster.'''
+    ids = []
+    for item in items:
+        try:
+            key = (True, item)
+            hash(key)
+        except TypeError:
+            # Unhashable, like dict.
+            key = (False, repr(item))
+        ids.append(item_to_id.setdefault(key, len(item_to_id)))
+    return ids
+
+
+def _myers_path(a, b, left, top, right, bottom, points):
+    '''Appends points of shortest edit path from (left, top) to (right, bottom) to points. Between
+    two points is diagonal of equal items and at most one delete or insert. False if box is empty.
+    '''
+    snake = _middle_snake(a, b, left, top, right, bottom)
+    if snake is None:
+        return False
+    start, finish = snake
+    if not _myers_path(a, b, left, top, start[0], start[1], points):
+        points.append(start)
+    if not _myers_path(a, b, finish[0], finish[1], right, bottom, points):
+        points.append(finish)
+    return True
+
+
+def _middle_snake(a, b, left, top, right, bottom):
+    '''Middle snake of shortest edit path in box, searching forward and backward at once. None if
+    box is empty.
+    '''
+    width = right - left
+    height = bottom - top
+    size = width + height
+    if size == 0:
+        return None
+    delta = width - height
+    max_d = (size + 1) // 2
+
+    # Furthest x for forward diagonal k, furthest y for backward diagonal c. Negative indices wrap.
+    forward = [0] * (2 * max_d + 2)
+    forward[1] = left
+    backward = [0] * (2 * max_d + 2)
+    backward[1] = bottom
+
+    for d in range(max_d + 1):
+        for k in range(d, -d - 1, -2):
+            c = k - delta
+            if k == -d or (k != d and forward[k - 1] < forward[k + 1]):
+                prev_x = x = forward[k + 1]
+            else:
+                prev_x = forward[k - 1]
+                x = prev_x + 1
+            y = top + (x - left) - k
+            prev_y = y if d == 0 or x != prev_x else y - 1
+            while x < right and y < bottom and a[x] == b[y]:
+                x += 1
+                y += 1
+            forward[k] = x
+            if delta % 2 and -(d - 1) <= c <= d - 1 and y >= backward[c]:
+                return (prev_x, prev_y), (x, y)
+
+        for c in range(d, -d - 1, -2):
+            k = c + delta
+            if c == -d or (c != d and backward[c - 1] > backward[c + 1]):
+                prev_y = y = backward[c + 1]
+            else:
+                prev_y = backward[c - 1]
+                y = prev_y - 1
+            x = left + (y - top) + k
+            prev_x = x if d == 0 or y != prev_y else x + 1
+            while x > left and y > top and a[x - 1] == b[y - 1]:
+                x -= 1
+                y -= 1
+            backward[c] = y
+            if not delta % 2 and -d <= k <= d and x <= forward[k]:
+                return (x, y), (prev_x, prev_y)
+
+
 def diff_dicts(apple, orange):
     '''Print difference between two dicts (apple vs. orange).
 
@@ -458,9 +1249,28 @@ def diff_dicts(apple, orange):
             print('\t{}: {}'.format(key, orange[key]))
 
 
-def diff(apple, orange):
-    '''Print difference between two dicts/lists (apple vs. orange). Non-recursive.'''
-    if isinstance(apple, list) and isinstance(orange, list):
+def diff(apple, orange, recursive=False):
+    '''Print difference between two dicts/lists (apple vs. orange). Non-recursive by default.
+
+    Recursive prints paths to every difference in nested dicts/lists. See iter_diff().
+    >>> diff({'a': {'b': [1, 2]}, 'c': 3}, {'a': {'b': [1, 5, 6]}}, recursive=True)
+    ['a']['b'][1]: 2 | 5
+    Orange only ['a']['b'][2]: 6
+    Apple only ['c']: 3
+    3 differences
+    '''
+    if recursive:
+        num_diffs = 0
+        for path, apple_val, orange_val in iter_diff(apple, orange):
+            if apple_val is MISSING:
+                print('Orange only {}: {}'.format(_format_path(path), orange_val))
+            elif orange_val is MISSING:
+                print('Apple only {}: {}'.format(_format_path(path), apple_val))
+            else:
+                print('{}: {} | {}'.format(_format_path(path), apple_val, orange_val))
+            num_diffs += 1
+        print('{} difference{}'.format(human_int(num_diffs), 's' if num_diffs != 1 else ''))
+    elif isinstance(apple, list) and isinstance(orange, list):
         diff_lists(apple, orange)
     elif isinstance(apple, dict) and isinstance(orange, dict):
         diff_dicts(apple, orange)
@@ -468,6 +1278,103 @@ def diff(apple, orange):
         print('Cannot diff type {} and type {}'.format(type(apple), type(orange)))
 
 
+class _Missing(object):
+    '''Placeholder for value missing from one side of iter_diff().'''
+
+    def __repr__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
+def iter_diff(apple, orange):
+    '''Yields (path, apple value, orange value) of every difference in nested dicts/lists/tuples.
+    Path is list of keys, same as get() takes. Value is MISSING if key/index is only on other side.
+
+    Identical subtrees are skipped with one == (compared in C), so only branches with differences
+    are walked in Python. Long lists are bisected by comparing slices, so a few changes in a list
+    of millions of items only walks those items.
+
+    >>> list(iter_diff({'a': [1, 2], 'b': 3}, {'a': [1, 5]}))
+    [(['a', 1], 2, 5), (['b'], 3, MISSING)]
+    '''
+    stack = [((), apple, orange)]
+    while stack:
+        path, apple_val, orange_val = stack.pop()
+        if apple_val is orange_val:
+            continue
+
+        if isinstance(apple_val, dict) and isinstance(orange_val, dict):
+            if apple_val == orange_val:
+                continue
+            children = []
+            for key, val in apple_val.items():
+                other = orange_val.get(key, MISSING)
+                if val is not other and val != other:
+                    children.append((path + (key,), val, other))
+            for key, val in orange_val.items():
+                if key not in apple_val:
+                    children.append((path + (key,), MISSING, val))
+        elif _is_sequence(apple_val) and type(apple_val) == type(orange_val):
+            if apple_val == orange_val:
+                continue
+            children = [
+                (path + (index,), apple_item, orange_item)
+                for index, apple_item, orange_item in _diff_sequence_items(apple_val, orange_val)]
+        else:
+            # Leaves, or containers of different types.
+            yield list(path), apple_val, orange_val
+            continue
+
+        # Pop children in order.
+        children.reverse()
+        stack.extend(children)
+
+
+# Length of list slice _diff_sequence_items() stops bisecting at.
+DIFF_BISECT_MIN_LENGTH = 32
+
+
+def _diff_sequence_items(apple, orange):
+    '''Yields (index, apple item, orange item) of items that are different in two lists/tuples. Item
+    is MISSING past end of shorter one.
+    '''
+    length = min(len(apple), len(orange))
+    ranges = [(0, length)]
+    while ranges:
+        start, end = ranges.pop()
+        if apple[start:end] == orange[start:end]:
+            continue
+        if end - start <= DIFF_BISECT_MIN_LENGTH:
+            for index in range(start, end):
+                if apple[index] != orange[index]:
+                    yield index, apple[index], orange[index]
+            continue
+        # Check first half before second half.
+        middle = (start + end) // 2
+        ranges.append((middle, end))
+        ranges.append((start, middle))
+
+    for index in range(length, max(len(apple), len(orange))):
+        yield (
+            index,
+            apple[index] if index < len(apple) else MISSING,
+            orange[index] if index < len(orange) else MISSING)
+
+
+def _is_sequence(data):
+    return isinstance(data, (list, tuple))
+
+
+# Timer schedules.
+FIXED_RATE = 'fixed_rate'
+FIXED_DELAY = 'fixed_delay'
+
+# Clock that can't go backwards, for scheduling.
+_clock = getattr(time, 'monotonic', time.time)
+
+
 class Timer(object):
     '''Run function call every sleep_seconds seconds. Can cancel with Ctrl+C.
 
@@ -512,11 +1419,23 @@ class Timer(object):
     2
     [2022-05-26 23:14:58] Function call finished in 0 seconds
     Stopping on result 2
+
+    Run multiple timers together with Scheduler.
+
+    Special kwargs (not passed to func):
+        schedule (str): FIXED_RATE to call every sleep_seconds from first call, no matter how long
+            calls take (default). FIXED_DELAY to wait sleep_seconds after each call finishes.
+        max_history (int): Only keep this many latest results and run_times, in deques instead of
+            lists. Keeps all in lists if None.
     '''
 
     def __init__(
             self, func, sleep_seconds, keep_results=True, stop_on_result=False, final_result=None,
             *args, **kwargs):
+        self.schedule = kwargs.pop('schedule', FIXED_RATE)
+        max_history = kwargs.pop('max_history', None)
+        if self.schedule not in (FIXED_RATE, FIXED_DELAY):
+            raise ValueError('Unrecognized schedule: {}'.format(self.schedule))
         self.func = func
         self.sleep_seconds = sleep_seconds
         self.keep_results = keep_results
@@ -524,8 +1443,12 @@ class Timer(object):
         self.final_result = final_result
         self.args = args
         self.kwargs = kwargs
-        self.results = []
-        self.run_times = []
+        self.results = _history(max_history)
+        self.run_times = _history(max_history)
+        self.lateness = _history(max_history)  # Seconds each call started after it was due.
+        self.overruns = 0  # Number of fixed rate calls skipped because previous call ran late.
+        self.stopped = False
+        self._count = 0
 
     def __repr__(self):
         return 'Timer(func={}, sleep_seconds={})'.format(
@@ -534,28 +1457,160 @@ class Timer(object):
     @property
     def times_ran(self):
         '''Number of times function was called.'''
-        return len(self.run_times)
+        return self._count
 
-    def run(self):
-        count = 1
-        while True:
-            print('{} {} {}'.format('-' * 20, count, '-' * 20))
-
-            start = time.time()
-            res = self.func(*self.args, **self.kwargs)
-            run_time = time.time() - start
+    @property
+    def stats(self):
+        '''Dict of run time, jitter (seconds call started late), and overrun stats.'''
+        run_times = list(self.run_times)
+        lateness = list(self.lateness)
+        return {
+            'times_ran': self._count,
+            'overruns': self.overruns,
+            'average_run_time': sum(run_times) / len(run_times) if run_times else None,
+            'max_run_time': max(run_times) if run_times else None,
+            'average_jitter': sum(lateness) / len(lateness) if lateness else None,
+            'max_jitter': max(lateness) if lateness else None,
+        }
 
+    def run(self):
+        '''Call function on schedule until stopped on result. Can cancel with Ctrl+C.'''
+        scheduler = Scheduler()
+        scheduler.add(self)
+        scheduler.run()
+
+    def _call(self, due):
+        '''Call function once, due at clock time due. Returns clock time next call is due, or None
+        if stopping.
+        '''
+        start = self._start_call(due)
+        res = self.func(*self.args, **self.kwargs)
+        return self._finish_call(due, start, res)
+
+    def _start_call(self, due):
+        '''Record and print start of call. Returns clock time call started.'''
+        start = _clock()
+        self.lateness.append(max(start - due, 0))
+        self._count += 1
+        print('{} {} {}'.format('-' * 20, self._count, '-' * 20))
+        return start
+
+    def _finish_call(self, due, start, res, timed_out=False):
+        '''Record result of call. Returns clock time next call is due, or None if stopping.'''
+        end = _clock()
+        run_time = end - start
+        self.run_times.append(run_time)
+        if timed_out:
+            print('[{}] Function call timed out after {}'.format(
+                my_timestamp(), human_time(run_time)))
+        else:
             print('[{}] Function call finished in {}'.format(my_timestamp(), human_time(run_time)))
             if self.keep_results:
                 self.results.append(res)
-            self.run_times.append(run_time)
-
             if self.stop_on_result and res == self.final_result:
                 print('Stopping on result :{}'.format(self.final_result))
-                break
+                self.stopped = True
+        if self.stopped:
+            return
+
+        if self.schedule == FIXED_DELAY:
+            next_due = end + self.sleep_seconds
+        else:
+            # Due every sleep_seconds from first call, so run time doesn't drift schedule. Skip
+            # calls missed while this one ran.
+            next_due = due + self.sleep_seconds
+            if next_due < end:
+                missed = int((end - next_due) // self.sleep_seconds) + 1
+                self.overruns += missed
+                next_due += missed * self.sleep_seconds
+        print('Sleeping for {}...'.format(human_time(max(next_due - _clock(), 0))))
+        return next_due
 
-            # Sleep for some time.
-            print('Sleeping for {}...'.format(human_time(self.sleep_seconds)))
-            time.sleep(self.sleep_seconds)
 
-            count += 1
+def _history(max_history):
+    '''List to keep all of Timer history, or deque to keep max_history latest.'''
+    return [] if max_history is None else deque(maxlen=max_history)
+
+
+class Scheduler(object):
+    '''Runs multiple Timers from one event loop, ordered by when each is due next in a heap.
+
+    >>> scheduler = Scheduler(max_workers=4)
+    >>> scheduler.add(Timer(check_disk_space, 60))
+    >>> scheduler.add(Timer(ping_server, 5, schedule=FIXED_DELAY))
+    >>> scheduler.run()
+
+    Args:
+        max_workers (int or None): Call functions in a thread pool of this many threads, so slow
+            calls don't delay other timers. Calls in loop's thread if None. A timer never runs two
+            calls at once.
+    '''
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self.timers = []
+        self._heap = []
+        self._order = itertools.count()  # Tie breaker for timers due at same time.
+        self._condition = threading.Condition()
+        self._num_running = 0
+
+    def __repr__(self):
+        return 'Scheduler({} timers)'.format(len(self.timers))
+
+    def add(self, timer, delay=0):
+        '''Schedule timer\'s first call in delay seconds.'''
+        self.timers.append(timer)
+        self._push(_clock() + delay, timer)
+
+    def run(self):
+        '''Run timers until all are stopped. Can cancel with Ctrl+C.'''
+        pool = None
+        if self.max_workers:
+            from concurrent.futures import ThreadPoolExecutor
+            pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while True:
+                with self._condition:
+                    # Wait for next timer due, or running calls to schedule again.
+                    while True:
+                        if not self._heap and not self._num_running:
+                            return
+                        timeout = self._heap[0][0] - _clock() if self._heap else None
+                        if timeout is not None and timeout <= 0:
+                            break
+                        self._condition.wait(timeout)
+                    due, _, timer = heapq.heappop(self._heap)
+                    if pool is not None:
+                        self._num_running += 1
+
+                if pool is None:
+                    self._call(timer, due)
+                else:
+                    pool.submit(self._call_in_pool, timer, due)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False)
+
+    def _push(self, due, timer):
+        with self._condition:
+            heapq.heappush(self._heap, (due, next(self._order), timer))
+            self._condition.notify()
+
+    def _call(self, timer, due):
+        if timer.stopped:
+            return
+        next_due = timer._call(due)
+        if next_due is not None:
+            self._push(next_due, timer)
+
+    def _call_in_pool(self, timer, due):
+        try:
+            self._call(timer, due)
+        except Exception:
+            traceback.print_exc()
+            print('Stopping {}'.format(timer))
+            timer.stopped = True
+        finally:
+            with self._condition:
+                self._num_running -= 1
+                self._condition.notify()
@@ -66,4 +66,4 @@ def find_traceback_in_files(file_paths, cpus=None):
         print('Globbing "{}"...'.format(file_paths))
         file_paths = glob.glob(file_paths)
         print('Found {} path(s)'.format(len(file_paths)))
-    return run_func(find_traceback, file_paths, cpus=cpus)
+    return run_func(find_traceback, file_paths, processes=cpus)
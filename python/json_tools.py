@@ -5,13 +5,25 @@ import collections
 import json
 import logging
 import os
+import re
 import tempfile
 
+from json.decoder import scanstring
+from json.scanner import NUMBER_RE
+
 import python_compatibility
 
 
 TEMP_DATA_JSON_FILE = os.path.join(tempfile.gettempdir(), 'python_interactive_data_dump.json')
 
+# Number of characters iter_json_events() reads from file at a time.
+JSON_CHUNK_SIZE = 65536
+_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+# Characters of number, true, false, or null token.
+_LITERAL_RE = re.compile(r'[^ \t\n\r,:\[\]{}"]*')
+_LITERALS = {'true': True, 'false': False, 'null': None}
+_CLOSE_TO_OPEN = {'}': '{', ']': '['}
+
 
 def dump_json(data, file_path=TEMP_DATA_JSON_FILE, indent=4, sort_keys=True, **dump_kwargs):
     '''Dump data to JSON file.
@@ -45,6 +57,21 @@ def load_json(file_path=TEMP_DATA_JSON_FILE, as_string=False):
     return _convert(data) if as_string else data
 
 
+def iter_json_lines(file_path):
+    '''Yields data of each line in JSON-lines file (one JSON value per line). Skips blank lines.
+
+    Args:
+        file_path (str): Path to .jsonl file.
+
+    Raises:
+        ValueError: Invalid JSON line.
+    '''
+    with open(file_path, 'r') as fil:
+        for line in fil:
+            if line.strip():
+                yield json.loads(line)
+
+
 def _convert(data):
     '''Convert unicode to string in dict.
 
@@ -57,3 +84,103 @@ def _convert(data):
     elif isinstance(data, collections.Iterable):
         return type(data)(map(_convert, data))
     return data
+
+
+def iter_json_events(file_path, chunk_size=JSON_CHUNK_SIZE):
+    '''Yields (event, value) parsing JSON file incrementally, without loading it all.
+
+    Only unparsed part of file is kept in memory, so memory stays flat regardless of file size.
+    Buffer only grows to fit the longest string in file.
+
+    >>> list(iter_json_events('fruits.json'))  # {"fruits": [{"name": "lemon", "cost": 3.24}]}
+    [('start_map', None), ('map_key', 'fruits'), ('start_array', None), ('start_map', None),
+    ('map_key', 'name'), ('value', 'lemon'), ('map_key', 'cost'), ('value', 3.24),
+    ('end_map', None), ('end_array', None), ('end_map', None)]
+
+    Args:
+        file_path (str): Path to .json file.
+        chunk_size (int): Number of characters to read at a time.
+
+    Raises:
+        ValueError: Invalid JSON.
+    '''
+    with open(file_path, 'r') as fil:
+        buf = ''
+        pos = 0
+        eof = False
+        stack = []  # Open containers, "{" or "[".
+        expect_key = False
+        while True:
+            pos = _WHITESPACE_RE.match(buf, pos).end()
+            need_more = pos >= len(buf)
+            if not need_more:
+                char = buf[pos]
+                if char == '{':
+                    stack.append(char)
+                    expect_key = True
+                    pos += 1
+                    yield 'start_map', None
+                elif char == '[':
+                    stack.append(char)
+                    expect_key = False
+                    pos += 1
+                    yield 'start_array', None
+                elif char in '}]':
+                    if not stack or _CLOSE_TO_OPEN[char] != stack.pop():
+                        raise ValueError('Unexpected "{}" in {}'.format(char, file_path))
+                    expect_key = False
+                    pos += 1
+                    yield ('end_map' if char == '}' else 'end_array'), None
+                elif char == ',':
+                    expect_key = bool(stack) and stack[-1] == '{'
+                    pos += 1
+                elif char == ':':
+                    expect_key = False
+                    pos += 1
+                elif char == '"':
+                    try:
+                        value, end = scanstring(buf, pos + 1)
+                    except ValueError:
+                        # String might continue in next chunk.
+                        if eof:
+                            raise
+                        need_more = True
+                    else:
+                        pos = end
+                        if expect_key:
+                            expect_key = False
+                            yield 'map_key', value
+                        else:
+                            yield 'value', value
+                else:
+                    end = _LITERAL_RE.match(buf, pos).end()
+                    if end >= len(buf) and not eof:
+                        # Number or literal might continue in next chunk.
+                        need_more = True
+                    else:
+                        yield 'value', _parse_literal(buf[pos:end], file_path)
+                        pos = end
+
+            if need_more:
+                if eof:
+                    break
+                chunk = fil.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+
+        if stack:
+            raise ValueError('Unexpected end of file {}'.format(file_path))
+
+
+def _parse_literal(token, file_path):
+    '''Number, true, false, or null token as Python value.'''
+    if token in _LITERALS:
+        return _LITERALS[token]
+    match = NUMBER_RE.match(token)
+    if not match or match.end() != len(token):
+        raise ValueError('Invalid token "{}" in {}'.format(token, file_path))
+    integer, frac, exp = match.groups()
+    if frac or exp:
+        return float(token)
+    return int(integer)
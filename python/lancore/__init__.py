@@ -2,15 +2,26 @@
 
 from __future__ import print_function
 
+import atexit
 import datetime
+import gc
+import json
 import os
 import sys
+import threading
 import time
 import traceback
+from bisect import bisect_right
 from functools import wraps
 
 from collections import OrderedDict, defaultdict, Counter
 
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2.
+    tracemalloc = None
+
 from my_logging import debug, info, warning, error, critical, demo_logging
 from my_settings import DATETIME_NICE, DATETIME_SORTABLE
 
@@ -29,6 +40,7 @@ INTERVALS = OrderedDict([
 LESS_THAN_A_SECOND = [
     'millisecond',
     'microsecond',
+    'nanosecond',
 ]
 
 
@@ -90,7 +102,7 @@ def human_time(seconds, decimals=1):
                 else:
                     res = round(seconds, decimals)
                 return '%s %s%s' % (str(res), interval, 's' if res != 1 else '')
-        # Less than a microsecond.
+        # Less than a nanosecond.
         return '0 seconds'
     elif 1 < seconds < INTERVALS['minute']:
         # A second to a minute.
@@ -138,7 +150,23 @@ def time_me(func, *args, **kwargs):
     Average time: 1.0 seconds
     Fastest time: 1.0 seconds
     Slowest time: 1.0 seconds
-    Standard deviation: 0.00
+    Median time: 1.0 seconds
+    Standard deviation: 0.2 milliseconds
+    95th percentile: 1.0 seconds
+    Outliers: 0
+
+    Also measure memory
+    >>> time_me(load_json, 'big.json', n=2, memory=True)
+    Running load_json(big.json)
+    1/2 [2020-03-11 00:03:48]: 2.1 seconds, peak 412.5 MB, net +398.2 MB, RSS +405.3 MB
+    2/2 [2020-03-11 00:03:50]: 2.0 seconds, peak 412.5 MB, net +0 B, RSS +0 B
+    ...
+    Max peak memory: 412.5 MB
+    Total net allocations: +398.2 MB
+    Top allocating lines:
+    /usr/lib/python3.8/json/decoder.py:353: size=398 MiB (+398 MiB), count=4013 (+4013), ...
+
+    For short functions, see benchmark().
 
     Args:
         func (function): Function to call.
@@ -147,6 +175,13 @@ def time_me(func, *args, **kwargs):
             n (int): Number of times to run func. Default to 1. If multiple, prints out simple stats
                 (ie. average time, total time).
             return_time (bool): If True, returns a tuple with result and time in seconds.
+            warmup (int): Number of untimed calls before timing. Defaults to 0.
+            disable_gc (bool): Disable garbage collection while timing if True.
+            json_path (str): Save stats to this JSON file under function name. See
+                compare_benchmarks().
+            memory (bool): Also report peak and net Python allocations per run with tracemalloc,
+                change in resident set size, and source lines allocating the most. Python 3 only.
+                Tracing slows down allocations, so times are higher than without.
 
     Returns:
         Anything: Whatever function call returns. None if call failed on first try.
@@ -156,48 +191,98 @@ def time_me(func, *args, **kwargs):
         return
     n = kwargs.pop('n', 1)
     return_time = kwargs.pop('return_time', False)
+    warmup = kwargs.pop('warmup', 0)
+    disable_gc = kwargs.pop('disable_gc', False)
+    json_path = kwargs.pop('json_path', None)
+    memory = kwargs.pop('memory', False)
+    if memory and not tracemalloc:
+        warning('Module tracemalloc not available. Not measuring memory.')
+        memory = False
 
     # Print nice function call.
     args_str = [str(arg) for arg in args]
     params = ', '.join(args_str + ['%s=%s' % (key, str(val)) for key, val in kwargs.items()])
     print('Running %s(%s)' % (func.__name__, params))
 
+    for _ in range(warmup):
+        func(*args, **kwargs)
+
     # Run function n times.
     run_times = []
+    run_memory = []
     res = None
-    for count in range(n):
-        sys.stdout.write('%i/%i [%s]: ' % (count + 1, n, my_timestamp()))
-        sys.stdout.flush()
-        start = time.time()
-
-        # Execute function call.
-        try:
-            res = func(*args, **kwargs)
-        except Exception as err:
-            # Function call errored.
-            end = time.time()
-            duration = end - start
-            print  # Newline before warning.
-            warning('Function errored after %s: %s' % (human_time(duration), err))
-            print(traceback.format_exc().strip())
-            return res
-
-        # Print how long did function call took
-        end = time.time()
-        duration = end - start
-        run_times.append(duration)
-        print(human_time(duration))
-
+    gc_was_enabled = gc.isenabled()
+    if disable_gc:
+        gc.disable()
+    was_tracing = memory and tracemalloc.is_tracing()
+    if memory:
+        if not was_tracing:
+            tracemalloc.start()
+        first_snapshot = tracemalloc.take_snapshot()
+    try:
+        for count in range(n):
+            sys.stdout.write('%i/%i [%s]: ' % (count + 1, n, my_timestamp()))
+            sys.stdout.flush()
+            if memory:
+                memory_before = _start_memory_run()
+            start = _perf_counter_ns()
+
+            # Execute function call.
+            try:
+                res = func(*args, **kwargs)
+            except Exception as err:
+                # Function call errored.
+                duration = (_perf_counter_ns() - start) / 1e9
+                print()  # Newline before warning.
+                warning('Function errored after %s: %s' % (human_time(duration), err))
+                print(traceback.format_exc().strip())
+                return res
+
+            # Print how long did function call took
+            duration = (_perf_counter_ns() - start) / 1e9
+            run_times.append(duration)
+            if memory:
+                run_memory.append(_finish_memory_run(memory_before))
+                print('%s, %s' % (human_time(duration), _format_memory_run(run_memory[-1])))
+            else:
+                print(human_time(duration))
+        if memory:
+            top_stats = _top_allocations(first_snapshot, tracemalloc.take_snapshot())
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+        if memory and not was_tracing:
+            tracemalloc.stop()
+
+    stats = _stats(run_times)
     if n >= 2:
         # Print total time and average time.
-        total = sum(run_times)
-        print('Total time: %s' % human_time(total))
-        print('Average time: %s' % human_time(total / n))
+        print('Total time: %s' % human_time(sum(run_times)))
+        print('Average time: %s' % human_time(stats['mean']))
 
     if n >= 3:
         # Print simple stats.
-        print('Fastest time: %s' % human_time(min(run_times)))
-        print('Slowest time: %s' % human_time(max(run_times)))
+        print('Fastest time: %s' % human_time(stats['min']))
+        print('Slowest time: %s' % human_time(stats['max']))
+        print('Median time: %s' % human_time(stats['median']))
+        print('Standard deviation: %s' % human_time(stats['stdev']))
+        print('95th percentile: %s' % human_time(stats['p95']))
+        print('Outliers: %i' % stats['outliers'])
+
+    if memory:
+        print('Max peak memory: %s' % human_size(max(mem['peak'] for mem in run_memory)))
+        print('Total net allocations: %s' % _human_size_change(
+            sum(mem['net'] for mem in run_memory)))
+        if top_stats:
+            print('Top allocating lines:')
+            for stat in top_stats:
+                print(stat)
+
+    if json_path:
+        stats.update({'name': func.__name__, 'loops': 1, 'repeat': n, 'times': run_times})
+        if memory:
+            stats['memory'] = run_memory
+        save_benchmarks([stats], json_path)
 
     if return_time:
         if n == 1:
@@ -208,15 +293,400 @@ def time_me(func, *args, **kwargs):
         return res
 
 
+# Number of source lines time_me(memory=True) prints allocations for.
+MEMORY_TOP_LINES = 5
+
+
+def _start_memory_run():
+    '''Traced memory and RSS before a time_me() run. Resets traced peak if possible.'''
+    if hasattr(tracemalloc, 'reset_peak'):
+        # Python 3.9+. Otherwise peak is since tracing started.
+        tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0], _rss()
+
+
+def _finish_memory_run(memory_before):
+    '''Dict of peak and net traced bytes, and RSS change (None if unknown) of time_me() run.'''
+    traced_before, rss_before = memory_before
+    current, peak = tracemalloc.get_traced_memory()
+    rss_after = _rss()
+    return {
+        'peak': max(peak - traced_before, 0),
+        'net': current - traced_before,
+        'rss': None if rss_before is None or rss_after is None else rss_after - rss_before,
+    }
+
+
+def _format_memory_run(mem):
+    '''Peak, net and RSS change as string (ie. 'peak 1.2 MB, net +3 kB, RSS +0 B').'''
+    res = 'peak %s, net %s' % (human_size(mem['peak']), _human_size_change(mem['net']))
+    if mem['rss'] is not None:
+        res += ', RSS %s' % _human_size_change(mem['rss'])
+    return res
+
+
+def _human_size_change(nbytes):
+    '''Signed human_size() (ie. '+1.2 MB' or '-3 kB').'''
+    return '%s%s' % ('-' if nbytes < 0 else '+', human_size(abs(nbytes)))
+
+
+def _top_allocations(first_snapshot, last_snapshot):
+    '''tracemalloc StatisticDiffs of source lines allocating the most between snapshots, excluding
+    tracemalloc and this module.
+    '''
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    stats = last_snapshot.filter_traces(filters).compare_to(
+        first_snapshot.filter_traces(filters), 'lineno')
+    return [stat for stat in stats if stat.size_diff > 0][:MEMORY_TOP_LINES]
+
+
+def _rss():
+    '''Resident set size of this process in bytes. None if unknown (only on Linux).'''
+    try:
+        with open('/proc/self/statm') as fil:
+            return int(fil.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError, AttributeError):
+        return None
+
+
+# Nanosecond clock for timing. Python 2 only has seconds as float.
+if hasattr(time, 'perf_counter_ns'):
+    _perf_counter_ns = time.perf_counter_ns
+else:
+    def _perf_counter_ns():
+        return int(getattr(time, 'perf_counter', time.time)() * 1e9)
+
+
+def benchmark(func, *args, **kwargs):
+    '''Times function like timeit, for functions too fast to time one call at a time. Returns
+    stats of time per call in seconds.
+
+    Calls are timed in samples of many loops. Number of loops is calibrated so each sample takes
+    at least min_time / repeat seconds, unless given.
+
+    >>> result = benchmark(sorted, list(range(1000)))
+    >>> print_benchmark(result)
+    sorted(): 4.1 microseconds median (5 x 50000 loops, stdev 39 nanoseconds, 0 outliers)
+    >>> save_benchmarks([result], 'before.json')
+
+    Args:
+        func (function): Function to call.
+        args (list): Args to pass to function.
+        kwargs (dict): Kwargs to pass to function. Contains these special ones for benchmark():
+            name (str): Name of benchmark. Defaults to function name.
+            loops (int): Number of calls per sample. Calibrated if None.
+            repeat (int): Number of samples. Defaults to 5.
+            warmup (int): Number of untimed calls before timing. Defaults to 1.
+            min_time (float): Seconds all samples should take at least when calibrating.
+            disable_gc (bool): Disable garbage collection while timing. Defaults to True, like
+                timeit.
+
+    Returns:
+        dict: Stats from _stats() with name, loops, repeat, and times (seconds per call in each
+            sample).
+    '''
+    name = kwargs.pop('name', func.__name__)
+    loops = kwargs.pop('loops', None)
+    repeat = kwargs.pop('repeat', 5)
+    warmup = kwargs.pop('warmup', 1)
+    min_time = kwargs.pop('min_time', 0.2)
+    disable_gc = kwargs.pop('disable_gc', True)
+
+    for _ in range(warmup):
+        func(*args, **kwargs)
+
+    gc_was_enabled = gc.isenabled()
+    if disable_gc:
+        gc.disable()
+    try:
+        if loops is None:
+            loops = _calibrate_loops(func, args, kwargs, float(min_time) / repeat)
+        times = [_time_loops(func, args, kwargs, loops) / loops for _ in range(repeat)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    result = _stats(times)
+    result.update({'name': name, 'loops': loops, 'repeat': repeat, 'times': times})
+    return result
+
+
+def _time_loops(func, args, kwargs, loops):
+    '''Seconds calling function loops times took.'''
+    start = _perf_counter_ns()
+    for _ in range(loops):
+        func(*args, **kwargs)
+    return (_perf_counter_ns() - start) / 1e9
+
+
+def _calibrate_loops(func, args, kwargs, min_seconds):
+    '''Number of loops (1, 2, 5, 10, 20, 50, ...) taking at least min_seconds.'''
+    loops = 1
+    while True:
+        for multiplier in (1, 2, 5):
+            if _time_loops(func, args, kwargs, loops * multiplier) >= min_seconds:
+                return loops * multiplier
+        loops *= 10
+
+
+def _stats(times):
+    '''Dict of min, max, mean, median, stdev, p5, p95 and number of outliers (outside 1.5
+    interquartile range) of times.
+    '''
+    if not times:
+        return {}
+    ordered = sorted(times)
+    count = len(ordered)
+    mean = sum(ordered) / count
+    stdev = (sum((x - mean) ** 2 for x in ordered) / (count - 1)) ** 0.5 if count > 1 else 0.0
+    quartile_1 = _percentile(ordered, 25)
+    quartile_3 = _percentile(ordered, 75)
+    iqr = quartile_3 - quartile_1
+    return {
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': mean,
+        'median': _percentile(ordered, 50),
+        'stdev': stdev,
+        'p5': _percentile(ordered, 5),
+        'p95': _percentile(ordered, 95),
+        'outliers': sum(
+            1 for x in ordered if x < quartile_1 - 1.5 * iqr or x > quartile_3 + 1.5 * iqr),
+    }
+
+
+def _percentile(ordered, percent):
+    '''Percentile of sorted values, linearly interpolated.'''
+    index = (len(ordered) - 1) * percent / 100.0
+    lower = int(index)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower)
+
+
+def print_benchmark(result):
+    '''Print one line summary of benchmark() result.'''
+    print('%s(): %s median (%i x %s loops, stdev %s, %i outliers)' % (
+        result['name'], human_time(result['median']), result['repeat'],
+        human_int(result['loops']), human_time(result['stdev']), result['outliers']))
+
+
+def save_benchmarks(results, file_path):
+    '''Save benchmark() results to JSON file, keyed by name. Updates results already in file.'''
+    has_results = os.path.isfile(file_path) and os.path.getsize(file_path)
+    name_to_result = load_benchmarks(file_path) if has_results else {}
+    for result in results:
+        result = dict(result, python=sys.version.split(' ')[0], timestamp=my_timestamp())
+        name_to_result[result['name']] = result
+    with open(file_path, 'w') as fil:
+        json.dump(name_to_result, fil, indent=4, sort_keys=True)
+
+
+def load_benchmarks(file_path):
+    '''Dict of name to benchmark() result from JSON file.'''
+    with open(file_path) as fil:
+        return json.load(fil)
+
+
+# Median slower than this ratio is a regression in compare_benchmarks().
+REGRESSION_THRESHOLD = 0.05
+
+
+def compare_benchmarks(old, new, threshold=REGRESSION_THRESHOLD):
+    '''Prints median change of benchmarks in both runs. Flags regressions, where new median is
+    slower by more than threshold and more than standard deviation of either run.
+
+    >>> compare_benchmarks('before.json', 'after.json')
+    sorted(): 4.1 microseconds -> 4.9 microseconds (+19.5%) REGRESSION
+    get(): 1.3 microseconds -> 0.8 microseconds (-38.5%)
+
+    Args:
+        old (dict or str): Name to benchmark() result, or JSON file saved by save_benchmarks().
+        new (dict or str): Same for new run.
+        threshold (float): Ratio of median slowdown to flag as regression.
+
+    Returns:
+        dict: Name to ratio of new median to old median of regressions.
+    '''
+    old = load_benchmarks(old) if isinstance(old, str) else old
+    new = load_benchmarks(new) if isinstance(new, str) else new
+    regressions = {}
+    for name in sorted(set(old) & set(new)):
+        old_median = old[name]['median']
+        new_median = new[name]['median']
+        ratio = new_median / old_median if old_median else float('inf')
+        noise = max(old[name]['stdev'], new[name]['stdev'])
+        is_regression = ratio > 1 + threshold and new_median - old_median > noise
+        if is_regression:
+            regressions[name] = ratio
+        print('%s(): %s -> %s (%+.1f%%)%s' % (
+            name, human_time(old_median), human_time(new_median), (ratio - 1) * 100,
+            ' REGRESSION' if is_regression else ''))
+    return regressions
+
+
 def time_me_wrapper(func):
-    '''Decorator for time_me().'''
+    '''Decorator for time_me(). Prints every call, so for hot functions use profile_me().'''
     @wraps(func)
     def wrapper(*args, **kwargs):
         '''Wrapper func.'''
-        time_me(func, *args, **kwargs)
+        return time_me(func, *args, **kwargs)
     return wrapper
 
 
+# Name to _ProfileStats of functions decorated with profile_me().
+_PROFILE_STATS = OrderedDict()
+# Per thread stack of time spent in profiled calls made by each running profiled call.
+_profile_local = threading.local()
+# Print profile_report() at exit if any profiled function was called.
+PROFILE_REPORT_AT_EXIT = True
+_profile_atexit_registered = []
+
+
+class _ProfileStats(object):
+    '''Aggregated call stats of a profiled function. Times in nanoseconds.'''
+    __slots__ = ('name', 'calls', 'sampled', 'total', 'own', 'histogram')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.sampled = 0  # Number of timed calls.
+        self.total = 0
+        self.own = 0
+        self.histogram = {}  # Bit length of duration to count, ie. 2^(bucket-1) <= ns < 2^bucket.
+
+
+def profile_me(func=None, sample_every=1):
+    '''Decorator aggregating call count, cumulative time, own time (excluding other profiled
+    calls) and latency histogram of function into process-wide registry. Nothing is printed per
+    call, so it can stay on hot functions. See profile_report().
+
+    >>> @profile_me
+    ... def parse(line): ...
+    >>> @profile_me(sample_every=100)
+    ... def lookup(key): ...
+    >>> profile_report()
+    name            calls  total      own          mean            p50            p99
+    __main__.parse  1,000  2 seconds  1.5 seconds  2 milliseconds  1 millisecond  9 milliseconds
+
+    Args:
+        func (function): Function to profile.
+        sample_every (int): Time only every nth call to lower overhead. Times are scaled up by
+            calls / timed calls. Own time of callers only excludes timed calls.
+
+    Returns:
+        function: Wrapped function.
+    '''
+    if func is None:
+        return lambda func: profile_me(func, sample_every=sample_every)
+
+    name = '%s.%s' % (func.__module__, getattr(func, '__qualname__', func.__name__))
+    stats = _PROFILE_STATS.get(name)
+    if stats is None:
+        stats = _PROFILE_STATS[name] = _ProfileStats(name)
+    if not _profile_atexit_registered:
+        atexit.register(_profile_report_at_exit)
+        _profile_atexit_registered.append(True)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        '''Wrapper func.'''
+        stats.calls += 1
+        if sample_every > 1 and stats.calls % sample_every:
+            return func(*args, **kwargs)
+        try:
+            stack = _profile_local.stack
+        except AttributeError:
+            stack = _profile_local.stack = []
+        stack.append(0)
+        start = _perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            duration = _perf_counter_ns() - start
+            child_time = stack.pop()
+            if stack:
+                stack[-1] += duration
+            stats.sampled += 1
+            stats.total += duration
+            stats.own += duration - child_time
+            bucket = duration.bit_length()
+            stats.histogram[bucket] = stats.histogram.get(bucket, 0) + 1
+    return wrapper
+
+
+def profile_stats():
+    '''List of dicts with profile stats of called profile_me() functions, slowest total first.
+    Times in seconds. Percentiles are upper bounds of power of 2 nanosecond histogram buckets.
+    '''
+    results = []
+    for stats in _PROFILE_STATS.values():
+        if not stats.sampled:
+            continue
+        scale = float(stats.calls) / stats.sampled / 1e9
+        result = {
+            'name': stats.name,
+            'calls': stats.calls,
+            'sampled': stats.sampled,
+            'total': stats.total * scale,
+            'own': stats.own * scale,
+            'mean': float(stats.total) / stats.sampled / 1e9,
+            'histogram': dict(stats.histogram),
+        }
+        for percent in (50, 90, 99):
+            result['p%i' % percent] = _histogram_percentile(stats.histogram, percent) / 1e9
+        results.append(result)
+    results.sort(key=lambda result: result['total'], reverse=True)
+    return results
+
+
+def _histogram_percentile(histogram, percent):
+    '''Upper bound of bucket containing percentile in bit length histogram.'''
+    target = sum(histogram.values()) * percent / 100.0
+    count = 0
+    for bucket in sorted(histogram):
+        count += histogram[bucket]
+        if count >= target:
+            return 2 ** bucket
+    return 0
+
+
+def profile_report(sort_by='total', limit=None):
+    '''Print table of profile_stats() sorted by sort_by (ie. 'total', 'own', 'calls', 'p99').'''
+    results = sorted(profile_stats(), key=lambda result: result[sort_by], reverse=True)[:limit]
+    if not results:
+        return
+    columns = ['calls', 'total', 'own', 'mean', 'p50', 'p99']
+    rows = [['name'] + columns]
+    for result in results:
+        rows.append([result['name'], human_int(result['calls'])] + [
+            human_time(result[column]) for column in columns[1:]])
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def dump_profile(file_path):
+    '''Dump profile_stats() to JSON file.'''
+    with open(file_path, 'w') as fil:
+        json.dump(profile_stats(), fil, indent=4, sort_keys=True)
+
+
+def reset_profile():
+    '''Clear stats of all profiled functions.'''
+    for name in _PROFILE_STATS:
+        _PROFILE_STATS[name].__init__(name)
+
+
+def _profile_report_at_exit():
+    '''Print profile_report() if enabled and anything was profiled.'''
+    if PROFILE_REPORT_AT_EXIT and any(stats.calls for stats in _PROFILE_STATS.values()):
+        print('Profile report:')
+        profile_report()
+
+
 def var_name(var, locals=locals()):
     '''Hacky way of getting variable name from variable. Empty string if not found.
 
@@ -249,12 +719,92 @@ def human_size(nbytes, base=BASE_10):
         nbytes (int): Number of bytes.
         base (int): How many bytes in 1 kilobyte/kibibyte? 1000 or 1024.
     '''
+    suffixes = BASE_10_SUFFIXES if base == BASE_10 else BASE_2_SUFFIXES
     i = 0
-    while nbytes >= base and i < len(BASE_2_SUFFIXES) - 1:
+    while nbytes >= base and i < len(suffixes) - 1:
         nbytes /= base
         i += 1
     f = ('%.2f' % nbytes).rstrip('0').rstrip('.')
-    return '%s %s' % (f, BASE_2_SUFFIXES[i])
+    return '%s %s' % (f, suffixes[i])
+
+
+'''Batch versions of human_time(), human_size() and human_int() for formatting many values (ie.
+reports of thousands of files). Same results as calling scalar version on each value, with
+thresholds and unit names computed once. Values can be any iterable, including NumPy arrays.
+'''
+# Seconds in each interval and its singular and plural name, shortest first.
+_INTERVAL_SECONDS = list(reversed(INTERVALS.values()))
+_INTERVAL_NAMES = [
+    (name, {'millennium': 'millennia', 'century': 'centuries'}.get(name, name + 's'))
+    for name in reversed(INTERVALS)]
+
+
+def _as_list(values):
+    '''Values as list of Python numbers. NumPy arrays are converted in one call.'''
+    tolist = getattr(values, 'tolist', None)
+    return tolist() if tolist else values
+
+
+def human_times(values, decimals=1):
+    '''List of human_time() of each value in seconds.
+
+    >>> human_times([15, 3720, 0.1])
+    ['15 seconds', '1 hour and 2 minutes', '100 milliseconds']
+    '''
+    seconds_list = _INTERVAL_SECONDS
+    names = _INTERVAL_NAMES
+    minute = INTERVALS['minute']
+    res = []
+    append = res.append
+    for seconds in _as_list(values):
+        if seconds >= minute:
+            # Most significant interval, then next one that fits in remainder.
+            i = bisect_right(seconds_list, seconds) - 1
+            quotient, remainder = divmod(seconds, seconds_list[i])
+            text = '%i %s' % (quotient, names[i][quotient > 1])
+            if remainder:
+                i = bisect_right(seconds_list, remainder) - 1
+                if i >= 0:
+                    quotient = remainder // seconds_list[i]
+                    text = '%s and %i %s' % (text, quotient, names[i][quotient > 1])
+            append(text)
+        elif 1 < seconds:
+            # A second to a minute.
+            append('%s seconds' % (
+                seconds if isinstance(seconds, int) else round(seconds, decimals)))
+        else:
+            append(human_time(seconds, decimals))
+    return res
+
+
+def human_sizes(values, base=BASE_10):
+    '''List of human_size() of each value in bytes.
+
+    >>> human_sizes([512, 2048, 10 ** 9])
+    ['512 B', '2.05 kB', '1 GB']
+    '''
+    suffixes = BASE_10_SUFFIXES if base == BASE_10 else BASE_2_SUFFIXES
+    units = [' ' + suffix for suffix in suffixes]
+    last = len(suffixes) - 1
+    res = []
+    append = res.append
+    for nbytes in _as_list(values):
+        # Divide one at a time like human_size() so float rounding is the same.
+        i = 0
+        while nbytes >= base and i < last:
+            nbytes /= base
+            i += 1
+        f = '%.2f' % nbytes
+        if f[-1] == '0':
+            # Strip trailing zeros and point.
+            f = f[:-3] if f[-2] == '0' else f[:-1]
+        append(f + units[i])
+    return res
+
+
+def human_ints(values):
+    '''List of human_int() of each int (ie. [1234, 5] -> ['1,234', '5']).'''
+    return ['{:,}'.format(int_) for int_ in _as_list(values)]
 
 
 def my_timestamp():
@@ -281,31 +831,95 @@ def _get_iterable(input_):
         raise TypeError('Not list or dict')
 
 
-def similarities(input_):
-    '''Dict shared in common among all dicts.
+def similarities(input_, max_distinct=MAX_NUM_SIMILARITIES_TO_PRINT):
+    '''Dict shared in common among all dicts. Prints counts of values of each key with at most
+    max_distinct different values.
+
+    Streams through dicts keeping at most max_distinct counts per key, so memory doesn't grow with
+    number of dicts. Unhashable values (ie. dicts, lists) are counted by their canonical JSON.
+
+    >>> similarities(DOGS)
+    age (3): {1: 1, 'not sure': 2, 'two': 1}
+    color (1): {'white': 1}
+    gender (1): {'male': 4}
+    >>> similarities([{'toys': ['ball']}, {'toys': ['ball']}])
+    toys (1): {["ball"]: 2}
+
+    Over JSON-lines file
+    >>> similarities(json_tools.iter_json_lines('dogs.jsonl'))
 
     Args:
-        input_ (list or dict): List/dict to find similarities in.
+        input_ (list, dict or iterator): Dicts to find similarities in.
+        max_distinct (int): Max number of different values of key to count as similar.
+
+    Returns:
+        dict: Key to dict of value to count, for keys with at most max_distinct values.
 
     Raises:
-        TypeError: Input not list or dict.
+        TypeError: Input not list, dict or iterator.
     '''
     from pprint import pprint
-    dd = defaultdict(list)
+    if isinstance(input_, (dict, list)):
+        dicts = (dict_ for _, dict_ in _get_iterable(input_))
+    elif hasattr(input_, '__next__') or hasattr(input_, 'next'):
+        dicts = input_
+    else:
+        raise TypeError('Not list, dict or iterator')
 
-    for _, dict_ in _get_iterable(input_):
+    # Key to fingerprint to count. None once key has too many different values.
+    key_to_counts = {}
+    for dict_ in dicts:
         for key, val in dict_.items():
-            # Skip unhashable.
-            if not val.__hash__:
+            counts = key_to_counts.get(key, {})
+            if counts is None:
                 continue
-
-            dd[key].append(val)
-    for key, vals in sorted(dd.items()):
-        counter = Counter(vals)
-        if len(counter) > MAX_NUM_SIMILARITIES_TO_PRINT:
+            fingerprint = _fingerprint(val)
+            counts[fingerprint] = counts.get(fingerprint, 0) + 1
+            # Stop counting key with too many different values.
+            key_to_counts[key] = counts if len(counts) <= max_distinct else None
+
+    res = {}
+    for key, counts in sorted(key_to_counts.items()):
+        if counts is None:
             continue
-        print('%s (%i): ' % (key, len(counter)), end='')
-        pprint(dict(counter))
+        res[key] = counts
+        print('%s (%i): ' % (key, len(counts)), end='')
+        pprint(counts)
+    return res
+
+
+class _Unhashable(str):
+    '''Canonical JSON of unhashable value. Not equal to same string value, prints unquoted.'''
+
+    def __eq__(self, other):
+        return type(other) is _Unhashable and str.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = str.__hash__
+    __repr__ = str.__str__
+
+
+def _fingerprint(val):
+    '''Value itself if hashable, else _Unhashable of its canonical JSON.'''
+    try:
+        hash(val)
+        return val
+    except TypeError:
+        pass
+    try:
+        return _Unhashable(json.dumps(val, sort_keys=True, default=_json_default))
+    except TypeError:
+        # Dict keys of different types can't be sorted.
+        return _Unhashable(repr(val))
+
+
+def _json_default(val):
+    '''JSON-able canonical form of value json can't dump (ie. sets).'''
+    if isinstance(val, (set, frozenset)):
+        return sorted(val, key=repr)
+    return repr(val)
 
 
 '''Data structures.'''
@@ -1,43 +1,231 @@
 '''Multiprocessing tools.'''
 
+import atexit
+import collections
+import itertools
 import multiprocessing
+import threading
 
+from concurrent import futures
+from concurrent.futures.process import BrokenProcessPool
 
-def run_func(func, args, processes=None, ordered=False, print_result=True, chunksize=1):
-    '''Creates multiprocessing pool and run function call on single arguments.
+from progress import Progress
 
-    Uses imap() to allow printing progress after each call, instead of having to wait for all calls
-    to finish.
+
+# Max number of chunks of args per process submitted to pool and not yet yielded by iter_func().
+IN_FLIGHT_CHUNKS_PER_PROCESS = 4
+
+# Number of processes to long-lived pool. See get_pool().
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(processes=None):
+    '''Long-lived process pool with number of processes, created on first call and reused after,
+    so calls to run_func() don't pay for starting processes every time. Shut down at exit or by
+    close_pools().
+
+    Processes are forked when started, so functions defined in __main__ after that can't be
+    unpickled by them and break the pool (each worker prints a traceback to stderr as it exits).
+    iter_func() then discards it, so next call creates a fresh pool, and retries its own chunks in
+    a pool of its own. See iter_func().
+
+    Args:
+        processes (int or None): Number of processes. Uses system CPUs if None.
+
+    Returns:
+        concurrent.futures.ProcessPoolExecutor: Pool.
+    '''
+    processes = multiprocessing.cpu_count() if processes is None else processes
+    with _POOLS_LOCK:
+        pool = _POOLS.get(processes)
+        if pool is None:
+            pool = _POOLS[processes] = futures.ProcessPoolExecutor(max_workers=processes)
+    return pool
+
+
+def _discard_pool(processes, pool):
+    '''Remove broken pool from get_pool() so next call creates new one.'''
+    with _POOLS_LOCK:
+        if _POOLS.get(processes) is pool:
+            del _POOLS[processes]
+    pool.shutdown(wait=False)
+
+
+def close_pools(terminate=False):
+    '''Shut down pools from get_pool() and wait for their processes to exit.
+
+    Args:
+        terminate (bool): Cancel work not started yet instead of waiting for it to finish.
+    '''
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=terminate)
+
+
+atexit.register(close_pools, terminate=True)
+
+
+def run_func(
+        func, args, processes=None, ordered=False, print_result=True, chunksize=1,
+        verbose=False):
+    '''Run function call on single arguments in long-lived process pool (see get_pool()).
+
+    Uses iter_func() to allow printing progress after each call, instead of having to wait for all
+    calls to finish. Progress is a status line redrawn up to 10 times a second (see
+    progress.Progress), or a line per result if verbose.
 
     Args:
         func (func(arg)): Function to call that takes a single argument.
             Returns a tuple of two. First one is the result. Second one is a string to print after
             function call. Makes it easier to see progress.
-        args ([arg]): List of single arguments to pass to func.
+        args (iterable): Single arguments to pass to func. Can be generator.
         processes (int or None): Number of CPUs to use. Uses system CPUs if None.
-        ordered (bool): Uses imap() if True. imap_unordered() otherwise.
-        print_result (bool): Prints result with progress if True.
+        ordered (bool): Results in order of args if True. In order of completion otherwise.
+        print_result (bool): Prints result with progress if True and verbose.
         chunksize (int): Same as the one used by the map() method. For very long iterables using a
             large value for chunksize can make the job complete much faster than using the default
             value of 1.
+        verbose (bool): Print line with every result instead of status line.
 
     Returns:
         list: List of results from function call. None if failed.
     '''
-    processes = multiprocessing.cpu_count() if processes is None else processes
-
-    # Launch multiprocessing pool.
-    pool = multiprocessing.Pool(processes=processes)
     results = []
-    count = len(args)
-    imap_func = pool.imap if ordered else pool.imap_unordered
+    count = len(args) if hasattr(args, '__len__') else None
+    progress = None if verbose else Progress(count, getattr(func, '__name__', ''))
     try:
-        for ind, result in enumerate(imap_func(func, args, chunksize=chunksize)):
+        for ind, result in enumerate(
+                iter_func(func, args, processes=processes, ordered=ordered, chunksize=chunksize)):
             # Print progress.
-            print('{}/{}: {}'.format(ind + 1, count, result if print_result else ''))
+            if progress is None:
+                print('{}{}: {}'.format(
+                    ind + 1, '' if count is None else '/{}'.format(count),
+                    result if print_result else ''))
+            else:
+                progress.update()
 
             results.append(result)
     except Exception as err:
-        print('One of the function calls errored: {}'.format(err))
+        message = 'One of the function calls errored: {}'.format(err)
+        if progress is None:
+            print(message)
+        else:
+            progress.update(done=0, errors=1)
+            progress.write(message)
+    finally:
+        if progress is not None:
+            progress.close()
 
     return results
+
+
+def iter_func(func, args, processes=None, ordered=False, chunksize=1, max_in_flight=None):
+    '''Yield results of function call on single arguments in long-lived process pool (see
+    get_pool()) as they complete.
+
+    Unlike Pool.imap(), which reads all of args up front, args are only read as chunks are
+    submitted, and at most max_in_flight chunks are submitted but not yet yielded at a time. So
+    memory stays flat however many args there are, as long as results are consumed. Chunks not
+    sent to processes yet are cancelled if function call raises or caller stops iterating, so they
+    don't hold up later calls sharing pool.
+
+    If pool breaks (ie. worker couldn't unpickle function defined in __main__ after pool started,
+    or another caller sharing pool crashed a worker), chunks not finished yet are resubmitted once
+    to a fresh pool used only by this call, so retries don't break pool for other callers. Raises
+    BrokenProcessPool if that pool breaks too, ie. function call itself crashes workers.
+
+    >>> for path, size in iter_func(file_size, iter_file_paths(root), chunksize=100):
+            sizes[path] = size
+
+    Args:
+        func (func(arg)): Function to call that takes a single argument. Must be picklable (ie.
+            module-level function).
+        args (iterable): Single arguments to pass to func. Can be generator.
+        processes (int or None): Number of processes in pool. Uses system CPUs if None.
+        ordered (bool): Yield results in order of args if True. In order of completion otherwise.
+        chunksize (int): Number of args sent to a process at a time.
+        max_in_flight (int or None): Max number of chunks submitted and not yet yielded.
+            Defaults to IN_FLIGHT_CHUNKS_PER_PROCESS per process.
+
+    Yields:
+        Result of function call on each arg. Raises first exception raised by function call, or
+        BrokenProcessPool if pool broke.
+    '''
+    processes = multiprocessing.cpu_count() if processes is None else processes
+    pool = get_pool(processes)
+    max_in_flight = max_in_flight or processes * IN_FLIGHT_CHUNKS_PER_PROCESS
+    chunks = _iter_chunks(args, chunksize)
+    in_flight = collections.OrderedDict()  # Future to chunk, in order submitted.
+    private_pool = None  # Pool only used by this call, after shared pool broke.
+    try:
+        while True:
+            while len(in_flight) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                in_flight[_submit(pool, func, chunk)] = chunk
+            if not in_flight:
+                return
+
+            if ordered:
+                done = [next(iter(in_flight))]
+                futures.wait(done)
+            else:
+                done, _ = futures.wait(in_flight, return_when=futures.FIRST_COMPLETED)
+            try:
+                results = [(future, future.result()) for future in done]
+            except BrokenProcessPool:
+                if private_pool is not None:
+                    raise
+                _discard_pool(processes, pool)
+                pool = private_pool = futures.ProcessPoolExecutor(max_workers=processes)
+                in_flight = collections.OrderedDict(
+                    (_resubmit(pool, future, func, chunk), chunk)
+                    for future, chunk in in_flight.items())
+                continue
+            for future, chunk_results in results:
+                del in_flight[future]
+                for result in chunk_results:
+                    yield result
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if private_pool is not None:
+            private_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(pool, func, chunk):
+    '''Future of chunk submitted to pool. Already failed with BrokenProcessPool if pool broke, so
+    iter_func() retries it like chunks pool broke on while running.
+    '''
+    try:
+        return pool.submit(_call_chunk, func, chunk)
+    except BrokenProcessPool as err:
+        future = futures.Future()
+        future.set_exception(err)
+        return future
+
+
+def _resubmit(pool, future, func, chunk):
+    '''Future of chunk submitted to pool, unless future from broken pool already finished it.'''
+    if future.done() and not future.cancelled() and future.exception() is None:
+        return future
+    return _submit(pool, func, chunk)
+
+
+def _iter_chunks(iterable, size):
+    '''Yield lists of up to size items of iterable.'''
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _call_chunk(func, chunk):
+    '''Worker for iter_func(). Results of function call on chunk of args.'''
+    return [func(arg) for arg in chunk]
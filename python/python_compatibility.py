@@ -27,13 +27,16 @@ def reload(module):
     _reload(module)
 
 
+# Python 2 uses basestring. Python 3 uses str. What gives?
+try:
+    STRING_TYPES = basestring
+except NameError:
+    STRING_TYPES = str
+
+
 def is_string(data):
     '''Check if input is string. Python 2 uses basestring. Python 3 uses str. What gives?'''
-    try:
-        basestring
-    except NameError:
-        return isinstance(data, str)
-    return isinstance(data, basestring)
+    return isinstance(data, STRING_TYPES)
 
 
 def exec_file(file_path):
@@ -1,31 +1,178 @@
 '''My list class with filtering, counting, and sorting.'''
 
+import heapq
+import itertools
+import keyword
 import re
+import sys
 
-from collections import Counter
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, OrderedDict
+from operator import attrgetter
 
+from python_compatibility import STRING_TYPES
 
-_OPERATOR_TO_FUNC = {
-    '': lambda a, b : a == b,  # Default compare.
-    'in': lambda a, b : a in b,
-    'is': lambda a, b : a is b,
-    'is_not': lambda a, b : a is not b,
-    'not_in': lambda a, b : a not in b,
-    'startswith': lambda a, b: a.startswith(b),
-    'endswith': lambda a, b: a.endswith(b),
-    'has': lambda a, b: b in a,
+try:
+    import numpy
+except ImportError:
+    # Columns use array module instead.
+    numpy = None
+
+
+def _in_test(values):
+    '''Test of value in values. Lists and tuples of hashable values are looked up as frozenset.'''
+    if isinstance(values, (list, tuple)):
+        try:
+            lookup = frozenset(values)
+        except TypeError:
+            pass
+        else:
+            def test(a):
+                try:
+                    return a in lookup
+                except TypeError:
+                    # Unhashable value.
+                    return a in values
+            return test
+    return lambda a: a in values
+
+
+def _regex_test(pattern):
+    '''Test of regex pattern (string or compiled) found in value.'''
+    search = re.compile(pattern).search
+    return lambda a: search(a) is not None
+
+
+def _icontains_test(text):
+    '''Test of text in value ignoring case.'''
+    text = text.lower()
+    return lambda a: text in a.lower()
+
+
+def _range_test(low_and_high):
+    '''Test of low <= value <= high.'''
+    low, high = low_and_high
+    return lambda a: low <= a <= high
+
+
+# Filter operator to function taking filter value and returning test of item value.
+_OPERATOR_TO_TEST = {
+    '': lambda b: lambda a: a == b,  # Default compare.
+    'in': _in_test,
+    'is': lambda b: lambda a: a is b,
+    'is_not': lambda b: lambda a: a is not b,
+    'not_in': lambda b: (lambda test: lambda a: not test(a))(_in_test(b)),
+    'startswith': lambda b: lambda a: a.startswith(b),
+    'endswith': lambda b: lambda a: a.endswith(b),
+    'has': lambda b: lambda a: b in a,
+    'gt': lambda b: lambda a: a > b,
+    'gte': lambda b: lambda a: a >= b,
+    'lt': lambda b: lambda a: a < b,
+    'lte': lambda b: lambda a: a <= b,
+    'range': _range_test,
+    'regex': _regex_test,
+    'icontains': _icontains_test,
+    'isnull': lambda b: lambda a: (a is None) == bool(b),
 }
-# Matches attribute and operator separated by double underscore "__" in key passed to
-# SmartList.filter().
-# "color" -> attr: "color", operator: "".
-# "car_make__in" -> attr: "car_make", operator: "in".
-# "color__not_in" -> attr: "color", operator: "not_in".
-# "color__startswith" -> attr: "color", operator: "startswith".
-_KEY_FILTER_RE = r'(?P<attr>.*?)(__)?(?P<operator>(|({})))$'.format('|'.join(_OPERATOR_TO_FUNC.keys()))
+
+
+def _parse_filter(kwargs):
+    '''Dict of (attr, operator) to value from SmartList.filter() kwargs. Key is attribute
+    optionally followed by double underscore "__" and operator. Nested attributes are separated by
+    double underscore too, and returned as tuple.
+
+    "color" -> attr: "color", operator: "".
+    "color__not_in" -> attr: "color", operator: "not_in".
+    "owner__name__startswith" -> attr: ("owner", "name"), operator: "startswith".
+    '''
+    attr_and_op_to_val = {}
+    for key, val in kwargs.items():
+        parts = key.split('__')
+        operator = ''
+        if len(parts) > 1 and parts[-1] in _OPERATOR_TO_TEST:
+            operator = parts.pop()
+        attr_and_op_to_val[(_parse_attr('__'.join(parts)), operator)] = val
+    return attr_and_op_to_val
+
+
+def _parse_attr(attr):
+    '''Tuple of nested attributes if separated by double underscore "__", else attr as is.'''
+    if not isinstance(attr, STRING_TYPES):
+        return attr
+    parts = attr.split('__')
+    if len(parts) == 1 or not all(parts):
+        # Single attribute, or one with leading/trailing double underscores like "__class__".
+        return attr
+    return tuple(parts)
+
+
+def _compile_predicate(conditions):
+    '''Function returning True if item matches all (attr, operator, value) conditions, checked in
+    order. Getters and tests are built once, so checking each item only calls them.
+    '''
+    compiled = [
+        (_compile_getter(attr), _OPERATOR_TO_TEST[operator](val))
+        for attr, operator, val in conditions]
+    if not compiled:
+        return lambda item: True
+    if len(compiled) == 1:
+        getter, test = compiled[0]
+        return lambda item: test(getter(item))
+
+    def predicate(item):
+        for getter, test in compiled:
+            if not test(getter(item)):
+                return False
+        return True
+    return predicate
+
+
+def _compile_getter(attr):
+    '''Function getting attribute from item like _get_attr(). Tuple attr is path of nested
+    attributes, where digits also index lists (ie. ("pets", "0", "name")).
+    '''
+    if isinstance(attr, tuple):
+        getters = [_compile_getter(part) for part in attr]
+
+        def get_path(item):
+            for getter in getters:
+                item = getter(item)
+            return item
+        return get_path
+    if callable(attr) or not isinstance(attr, STRING_TYPES):
+        return lambda item: _get_attr(item, attr)
+
+    get_attribute = attrgetter(attr) if '.' not in attr else lambda item: getattr(item, attr)
+    # Plain dicts can't have other attributes than dict's, so skip trying attribute.
+    is_dict_attr = hasattr(dict, attr)
+    index = int(attr) if attr.isdigit() else None
+
+    def getter(item):
+        if type(item) is dict and not is_dict_attr:
+            if attr in item:
+                return item[attr]
+        else:
+            try:
+                return get_attribute(item)
+            except AttributeError:
+                pass
+            try:
+                return item[attr]
+            except Exception:
+                pass
+            if index is not None and isinstance(item, (list, tuple)) and index < len(item):
+                return item[index]
+        raise ValueError('Could not get key "{}" in item {}'.format(attr, item))
+    return getter
 
 
 def _get_attr(item, key):
-    '''Get value from key in item. Can be attribute or square bracket ([]) key.'''
+    '''Get value from key in item. Can be attribute, square bracket ([]) key, or function taking
+    item (ie. cli_tools.compile_path('owner name') for nested keys).
+    '''
+    if callable(key):
+        return key(item)
     if hasattr(item, key):
         return getattr(item, key)
     # Try square bracket get.
@@ -36,8 +183,297 @@ def _get_attr(item, key):
     raise ValueError('Could not get key "{}" in item {}'.format(key, item))
 
 
+# Collections of values that filter(attr__in=values) can look up in index.
+_INDEXABLE_IN_TYPES = (list, tuple, set, frozenset)
+# Operators that _Index looks up by bisecting sorted values.
+_SORTED_OPERATORS = ('startswith', 'gt', 'gte', 'lt', 'lte', 'range')
+
+
+class _Index(object):
+    '''Positions of items in SmartList by attribute value. Looks up equality and "in" by hash, and
+    "startswith" and comparisons by bisecting sorted values of same kind (strings or numbers).
+    '''
+
+    def __init__(self, attr, items):
+        self.attr = attr
+        self.positions = {}  # Value to ascending positions of items with value.
+        self.unindexed = set()  # Positions of items with missing or unhashable value.
+        self._sorted = {}  # Kind to sorted values of kind, built on first use.
+        self._get = _compile_getter(_parse_attr(attr))
+        for pos, item in enumerate(items):
+            self.add(item, pos)
+
+    def add(self, item, pos):
+        '''Index item at position.'''
+        try:
+            val = self._get(item)
+            positions = self.positions.get(val)
+        except (ValueError, TypeError):
+            self.unindexed.add(pos)
+            return
+        if positions is None:
+            self.positions[val] = [pos]
+            self._sorted = {}
+        elif positions[-1] < pos:
+            positions.append(pos)
+        else:
+            insort(positions, pos)
+
+    def remove(self, item, pos):
+        '''Remove item at position from index. False if item's value changed since indexed.'''
+        if pos in self.unindexed:
+            self.unindexed.discard(pos)
+            return True
+        try:
+            val = self._get(item)
+            positions = self.positions[val]
+        except (ValueError, TypeError, KeyError):
+            return False
+        i = bisect_left(positions, pos)
+        if i == len(positions) or positions[i] != pos:
+            return False
+        del positions[i]
+        if not positions:
+            del self.positions[val]
+            self._sorted = {}
+        return True
+
+    def lookup(self, operator, val):
+        '''Set of positions of items that may match operator and value, or None if index can't
+        be used. Includes unindexed positions, so items still need to be checked.
+        '''
+        try:
+            if operator == '':
+                found = self.positions.get(val, ())
+            elif operator == 'in' and isinstance(val, _INDEXABLE_IN_TYPES):
+                found = set()
+                for sub_val in val:
+                    found.update(self.positions.get(sub_val, ()))
+            elif operator in _SORTED_OPERATORS:
+                found = self._sorted_lookup(operator, val)
+                if found is None:
+                    return None
+            else:
+                return None
+        except TypeError:
+            # Unhashable filter value.
+            return None
+        res = set(found)
+        res.update(self.unindexed)
+        return res
+
+    def _sorted_lookup(self, operator, val):
+        '''Positions of values of same kind as filter value matching operator, and of values of
+        other kinds, to be checked like without index. None if value isn't string or number.
+        '''
+        bounds = val if operator == 'range' else (val,)
+        try:
+            kinds = set(_value_kind(bound) for bound in bounds)
+        except TypeError:
+            return None
+        if len(kinds) != 1 or None in kinds or (operator == 'startswith' and kinds != {str}):
+            return None
+        kind = kinds.pop()
+        values = self._sorted_values(kind)
+
+        if operator == 'startswith':
+            i = j = bisect_left(values, val)
+            while j < len(values) and values[j].startswith(val):
+                j += 1
+        elif operator == 'range':
+            i, j = bisect_left(values, val[0]), bisect_right(values, val[1])
+        else:
+            i, j = {
+                'gt': (bisect_right(values, val), len(values)),
+                'gte': (bisect_left(values, val), len(values)),
+                'lt': (0, bisect_left(values, val)),
+                'lte': (0, bisect_right(values, val)),
+            }[operator]
+
+        found = []
+        for sorted_val in values[i:j]:
+            found.extend(self.positions[sorted_val])
+        if len(values) < len(self.positions):
+            for other_val, positions in self.positions.items():
+                if _value_kind(other_val) is not kind and other_val == other_val:
+                    found.extend(positions)
+        return found
+
+    def _sorted_values(self, kind):
+        '''Sorted values of kind (str or float for numbers), cached. NaN is left out since it
+        never compares true.
+        '''
+        if kind not in self._sorted:
+            self._sorted[kind] = sorted(
+                val for val in self.positions if _value_kind(val) is kind and val == val)
+        return self._sorted[kind]
+
+
+def _value_kind(val):
+    '''str for strings, float for numbers, None for other values. Values of a kind can be
+    sorted together.
+    '''
+    if isinstance(val, STRING_TYPES):
+        return str
+    if isinstance(val, _NUMBER_TYPES):
+        return float
+    return None
+
+
+class _Row(object):
+    '''Base of compact dict-like rows from SmartList.from_dicts(). Subclasses have __slots__ and
+    _fields of keys. Values can be changed as attributes (row.name = 'Rex'), but not keys.
+    '''
+    __slots__ = ()
+    _fields = ()
+
+    def __init__(self, record):
+        for key, val in record.items():
+            setattr(self, key, val)
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._fields and hasattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self._fields else default
+
+    def keys(self):
+        return [key for key in self._fields if hasattr(self, key)]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def to_dict(self):
+        '''Row as dict.'''
+        return dict(self.items())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (_Row, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __ne__(self, other):
+        res = self.__eq__(other)
+        return res if res is NotImplemented else not res
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Row({!r})'.format(self.to_dict())
+
+    def __reduce__(self):
+        # Generated classes can't be pickled by name, so rebuild class from fields.
+        return _rebuild_row, (self._fields, self.to_dict())
+
+
+def _rebuild_row(fields, record):
+    '''Unpickle _Row with class for fields.'''
+    return _row_class(fields)(record)
+
+
+# Tuple of fields to generated _Row subclass, so same schema reuses class.
+_ROW_CLASSES = {}
+
+
+def _row_class(fields):
+    '''_Row subclass with slots for tuple of keys. None if any key isn't a valid attribute name or
+    clashes with _Row's.
+    '''
+    for key in fields:
+        if (not isinstance(key, str) or not re.match(r'[A-Za-z_]\w*\Z', key)
+                or key.startswith('__') or keyword.iskeyword(key) or hasattr(_Row, key)):
+            return None
+    if fields not in _ROW_CLASSES:
+        _ROW_CLASSES[fields] = type('Row', (_Row,), {'__slots__': fields, '_fields': fields})
+    return _ROW_CLASSES[fields]
+
+
+# Types of values min(), max(), average(), sum() and percentile() use.
+_NUMBER_TYPES = (int, float)
+# SmartList.group_by() aggregate to function of running count, total, min and max.
+_GROUP_AGGREGATES = {
+    'count': lambda count, total, min_, max_: count,
+    'sum': lambda count, total, min_, max_: total,
+    'min': lambda count, total, min_, max_: min_,
+    'max': lambda count, total, min_, max_: max_,
+    'average': lambda count, total, min_, max_: float(total) / count if count else None,
+}
+
+
+class _Column(object):
+    '''Attribute values of SmartList items, materialized once. Int/float values are also kept in
+    typed NumPy or array module array, with mask of which items have one.
+    '''
+
+    def __init__(self, attr, items):
+        self.attr = attr
+        self.values = [_get_attr(item, attr) for item in items]
+        self.mask = bytearray(isinstance(val, _NUMBER_TYPES) for val in self.values)
+        self.numbers = _typed_array(
+            [val for val, is_number in zip(self.values, self.mask) if is_number])
+        self._sorted_numbers = None
+
+    def sorted_numbers(self):
+        '''Int/float values sorted, cached.'''
+        if self._sorted_numbers is None:
+            if numpy is not None:
+                self._sorted_numbers = numpy.sort(self.numbers)
+            else:
+                self._sorted_numbers = sorted(self.numbers)
+        return self._sorted_numbers
+
+
+def _typed_array(numbers):
+    '''Numbers as NumPy array if available, else array module array. 64-bit ints if all are ints
+    that fit, else 64-bit floats.
+    '''
+    all_ints = all(type(val) is not float for val in numbers)
+    if numpy is not None:
+        try:
+            return numpy.array(numbers, dtype=numpy.int64 if all_ints else numpy.float64)
+        except OverflowError:
+            return numpy.array(numbers, dtype=numpy.float64)
+    if all_ints:
+        try:
+            return array('q', numbers)
+        except OverflowError:
+            pass
+    return array('d', numbers)
+
+
+def _reduce(values, func_name):
+    '''min, max or sum of values as Python int/float. Vectorized for NumPy arrays.'''
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        return _to_python(getattr(values, func_name)())
+    return {'min': min, 'max': max, 'sum': sum}[func_name](values)
+
+
+def _to_python(val):
+    '''NumPy scalar as Python int/float. Other values as is.'''
+    return val.item() if hasattr(val, 'item') else val
+
+
 class SmartList(list):
-    '''List with filtering and counting by attribute.'''
+    '''List with filtering and counting by attribute.
+
+    Indexes from create_index() speed up filter() on large lists. They are updated by append(),
+    extend() and item assignment, and rebuilt on next filter() after other changes to list. Changes
+    to attributes of items already in list aren't seen, so call create_index() again after those.
+    '''
 
     max_repr_chars = 50
 
@@ -47,6 +483,151 @@ class SmartList(list):
         elif len(args) == 1 and not isinstance(args[0], list):
             args = (list(args),)
         super(SmartList, self).__init__(*args)
+        # Attribute to _Index or _Column, or None if it needs rebuilding.
+        self._indexes = {}
+        self._columns = {}
+
+    def __reduce_ex__(self, protocol):
+        '''Pickle as new list of items, so mutators aren't called before __init__(). Indexes and
+        columns are derived from items, so only their attributes are pickled. They're rebuilt on
+        first use after unpickling.
+        '''
+        state = dict(self.__dict__)
+        state['_indexes'] = dict.fromkeys(self._indexes)
+        state['_columns'] = dict.fromkeys(self._columns)
+        return self.__class__, (list(self),), state
+
+    def create_index(self, attr):
+        '''Index items by attribute for filter() to look up equality, "in", "startswith" and
+        comparisons (gt, gte, lt, lte, range) instead of checking every item. Nested attributes are
+        separated by double underscore "__" like in filter().
+        '''
+        self._indexes[attr] = _Index(attr, self)
+
+    def drop_index(self, attr):
+        '''Remove index of attribute.'''
+        self._indexes.pop(attr, None)
+
+    def _get_index(self, attr):
+        '''_Index of attribute, rebuilt if needed. None if attribute not indexed.'''
+        if attr not in self._indexes:
+            return None
+        index = self._indexes[attr]
+        if index is None:
+            index = self._indexes[attr] = _Index(attr, self)
+        return index
+
+    def _invalidate(self):
+        '''Rebuild indexes and columns on next use, after items moved.'''
+        for attr in self._indexes:
+            self._indexes[attr] = None
+        self._invalidate_columns()
+
+    def create_columns(self, *attrs):
+        '''Materialize attribute values into columns once, for min(), max(), average(), sum(),
+        percentile(), attr_counter() and group_by() to run over without getting attribute of every
+        item each call. Columns are rebuilt on next use after list changes.
+
+        >>> people.create_columns('age', 'city')
+        >>> people.average('age'), people.percentile('age', 90)
+        (41.2, 67.0)
+        >>> people.group_by('city', 'age', 'average')
+        OrderedDict([('Toronto', 38.5), ('Paris', 44.0)])
+        '''
+        for attr in attrs:
+            self._columns[attr] = _Column(attr, self)
+
+    def drop_columns(self, *attrs):
+        '''Remove columns of attributes.'''
+        for attr in attrs:
+            self._columns.pop(attr, None)
+
+    def _get_column(self, attr):
+        '''_Column of attribute, rebuilt if needed. None if attribute has no column.'''
+        if attr not in self._columns:
+            return None
+        column = self._columns[attr]
+        if column is None:
+            column = self._columns[attr] = _Column(attr, self)
+        return column
+
+    def _invalidate_columns(self):
+        '''Rebuild columns on next use.'''
+        for attr in self._columns:
+            self._columns[attr] = None
+
+    def append(self, item):
+        super(SmartList, self).append(item)
+        if self._columns:
+            self._invalidate_columns()
+        for index in self._indexes.values():
+            if index is not None:
+                index.add(item, len(self) - 1)
+
+    def extend(self, items):
+        start = len(self)
+        super(SmartList, self).extend(items)
+        if self._columns:
+            self._invalidate_columns()
+        for index in self._indexes.values():
+            if index is not None:
+                for pos in range(start, len(self)):
+                    index.add(self[pos], pos)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __setitem__(self, key, item):
+        if self._columns:
+            self._invalidate_columns()
+        if not self._indexes or isinstance(key, slice):
+            super(SmartList, self).__setitem__(key, item)
+            if isinstance(key, slice):
+                self._invalidate()
+            return
+        pos = key + len(self) if key < 0 else key
+        old_item = self[pos]
+        super(SmartList, self).__setitem__(pos, item)
+        for attr, index in self._indexes.items():
+            if index is not None:
+                if index.remove(old_item, pos):
+                    index.add(item, pos)
+                else:
+                    self._indexes[attr] = None
+
+    def __delitem__(self, key):
+        super(SmartList, self).__delitem__(key)
+        self._invalidate()
+
+    def __imul__(self, count):
+        res = super(SmartList, self).__imul__(count)
+        self._invalidate()
+        return res
+
+    def insert(self, pos, item):
+        super(SmartList, self).insert(pos, item)
+        self._invalidate()
+
+    def pop(self, *args):
+        item = super(SmartList, self).pop(*args)
+        self._invalidate()
+        return item
+
+    def remove(self, item):
+        super(SmartList, self).remove(item)
+        self._invalidate()
+
+    def clear(self):
+        del self[:]
+
+    def sort(self, *args, **kwargs):
+        super(SmartList, self).sort(*args, **kwargs)
+        self._invalidate()
+
+    def reverse(self):
+        super(SmartList, self).reverse()
+        self._invalidate()
 
     def __repr__(self):
         '''If too many characters, print length and type.'''
@@ -70,7 +651,7 @@ class SmartList(list):
         '''Unique list of all keys in list.'''
         keys = set()
         for item in self:
-            if isinstance(item, dict):
+            if isinstance(item, (dict, _Row)):
                 keys.update(item.keys())
         return list(keys)
 
@@ -95,45 +676,368 @@ class SmartList(list):
 
     def attr_counter(self, attr):
         '''Returns counter of attribute.'''
+        column = self._get_column(attr)
+        if column is not None:
+            return Counter(column.values)
         return Counter(_get_attr(item, attr) for item in self)
 
+    def _numbers(self, attr):
+        '''Attribute values of type int/float, from column if any.'''
+        column = self._get_column(attr)
+        if column is not None:
+            return column.numbers
+        return self.attr(attr, types=_NUMBER_TYPES)
+
     def min(self, attr):
         '''Minimum of attribute values of type int/float.'''
-        return min(self.attr(attr, types=(int, float)))
+        return _reduce(self._numbers(attr), 'min')
 
     def average(self, attr):
         '''Average of attribute values as float. Only sums from ints, floats and longs.'''
-        values = self.attr(attr, types=(int, float))
-        if not values:
+        values = self._numbers(attr)
+        if not len(values):
             return
-        return float(sum(values)) / len(values)
+        return float(_reduce(values, 'sum')) / len(values)
 
     def max(self, attr):
         '''Maximum of attribute values of type int/float.'''
-        return max(self.attr(attr, types=(int, float)))
+        return _reduce(self._numbers(attr), 'max')
+
+    def sum(self, attr):
+        '''Sum of attribute values of type int/float.'''
+        return _reduce(self._numbers(attr), 'sum')
+
+    def percentile(self, attr, percent):
+        '''Percentile (0 to 100) of attribute values of type int/float, linearly interpolated
+        between closest values. None if no values.
+        '''
+        column = self._get_column(attr)
+        ordered = column.sorted_numbers() if column is not None else sorted(self._numbers(attr))
+        if not len(ordered):
+            return
+        index = (len(ordered) - 1) * percent / 100.0
+        lower = int(index)
+        upper = min(lower + 1, len(ordered) - 1)
+        return _to_python(ordered[lower] + (ordered[upper] - ordered[lower]) * (index - lower))
+
+    def group_by(self, attr, value_attr=None, aggregate='count'):
+        '''Groups items by attribute value, in order first seen.
+
+        >>> dogs.group_by('breed')
+        OrderedDict([('Samoyed', SmartList(2 Dog)), ('Maltese', SmartList(1 Dog)), ...])
+        >>> dogs.group_by('breed', 'age', 'max')
+        OrderedDict([('Samoyed', 6), ('Maltese', None), ...])
+
+        Args:
+            attr (str or function): Attribute to group by.
+            value_attr (str or function): Attribute to aggregate per group. If None, groups are
+                SmartLists of items.
+            aggregate (str): 'count', 'sum', 'min', 'max' or 'average' of int/float values of
+                value_attr. Groups without int/float values get None, except 0 for count/sum.
+
+        Returns:
+            OrderedDict: Attribute value to SmartList or aggregate.
+
+        Raises:
+            ValueError: Unrecognized aggregate.
+        '''
+        keys = self._values(attr)
+        if value_attr is None:
+            groups = OrderedDict()
+            for key, item in zip(keys, self):
+                if key not in groups:
+                    groups[key] = SmartList()
+                groups[key].append(item)
+            return groups
+
+        if aggregate not in _GROUP_AGGREGATES:
+            raise ValueError('Unrecognized aggregate: {}'.format(aggregate))
+        # Running [count, total, min, max] of int/float values per key.
+        stats = OrderedDict()
+        for key, val in zip(keys, self._values(value_attr)):
+            stat = stats.get(key)
+            if stat is None:
+                stat = stats[key] = [0, 0, None, None]
+            if isinstance(val, _NUMBER_TYPES):
+                stat[0] += 1
+                stat[1] += val
+                if stat[2] is None or val < stat[2]:
+                    stat[2] = val
+                if stat[3] is None or val > stat[3]:
+                    stat[3] = val
+        return OrderedDict(
+            (key, _GROUP_AGGREGATES[aggregate](*stat)) for key, stat in stats.items())
+
+    def _values(self, attr):
+        '''List of attribute values of all items, from column if any.'''
+        column = self._get_column(attr)
+        if column is not None:
+            return column.values
+        return [_get_attr(item, attr) for item in self]
+
+    @classmethod
+    def from_dicts(cls, records, compact=True, report=False):
+        '''SmartList of records. If compact, dicts are stored as generated Row objects with
+        __slots__ for keys, which use a fraction of memory of dicts. Rows act like dicts
+        (row['name'], row.get(), row.keys(), row == dict) and also have keys as attributes
+        (row.name), so filter(), attr(), keys and types keep working. Keys missing from a record
+        are missing from its row too. Records are converted as they're read, so dicts from an
+        iterator don't all need to be in memory at once.
+
+        Falls back to dicts if keys can't be attribute names. Memory saved in bytes (not counting
+        values, which are shared) is kept in memory_saved.
+
+        >>> dogs = SmartList.from_dicts(json_tools.iter_json_lines('dogs.jsonl'), report=True)
+        Compact rows: 1,000,000 rows use 72 MB instead of 352 MB (saved 280 MB)
+
+        Args:
+            records (iterable): Dicts.
+            compact (bool): Store records as rows.
+            report (bool): Print memory saved.
+
+        Returns:
+            SmartList: Rows or dicts.
+        '''
+        # Rows are built while iterating, so records don't all need to be in memory at once. Row
+        # class grows when a record has new keys, and earlier rows are rebuilt with it, so all
+        # rows have one class.
+        rows = []
+        rows_size = records_size = 0
+        fields = ()
+        field_set = frozenset()
+        row_class = None
+        for record in records:
+            if compact and (row_class is None or not isinstance(record, dict)
+                    or not field_set.issuperset(record)):
+                if isinstance(record, dict):
+                    fields += tuple(key for key in record if key not in field_set)
+                    field_set = frozenset(fields)
+                    row_class = _row_class(fields)
+                else:
+                    row_class = None
+                if row_class is None:
+                    # Fall back to dicts.
+                    compact = False
+                    rows = [row.to_dict() for row in rows]
+                    rows_size = records_size = 0
+                else:
+                    rows = [row_class(row.to_dict()) for row in rows]
+                    # Rows of same class are same size.
+                    row_size = sys.getsizeof(row_class({}))
+                    rows_size = len(rows) * row_size
+            if compact:
+                rows.append(row_class(record))
+                rows_size += row_size
+                records_size += sys.getsizeof(record)
+            else:
+                rows.append(record)
+
+        smart_list = cls(rows)
+        smart_list.memory_saved = records_size - rows_size
+        if report and compact:
+            from lancore import human_int, human_size
+            print('Compact rows: {} rows use {} instead of {} (saved {})'.format(
+                human_int(len(rows)), human_size(rows_size), human_size(records_size),
+                human_size(smart_list.memory_saved)))
+        return smart_list
+
+    def query(self):
+        '''Lazy Query of list, for chaining filter(), order_by() and limit() in one pass.'''
+        return Query(self)
 
     def filter(self, **kwargs):
         '''Returns new SmartList instance filtered by attributes/values using an AND operation.
 
-        By default, compares with double-equal "==".
+        By default, compares with double-equal "==". Other operators follow attribute after double
+        underscore "__":
+            in, not_in: Value in or not in given values.
+            is, is_not: Value is or is not given object (ie. None).
+            startswith, endswith, has: Value starts with, ends with, or contains given value.
+            gt, gte, lt, lte: Value >, >=, <, or <= given value.
+            range: Value between given (low, high), inclusive.
+            regex: Given regex pattern found in value.
+            icontains: Given string in value ignoring case.
+            isnull: Value is None if given True, else not None.
+
+        Nested attributes are separated by double underscore too.
+
+        >>> dogs.filter(breed__in=['Samoyed', 'Maltese'], age__range=(2, 5))
+        >>> people.filter(address__city__icontains='york', pets__0__name__regex=r'^B')
         '''
-        # Get (attr, operator) to operator from kwargs.
-        attr_and_op_to_val = {}
-        for key, val in kwargs.items():
-            res = re.match(_KEY_FILTER_RE, key)
-            if res:
-                attr_and_op_to_val[(res.group('attr'), res.group('operator'))] = val
-            else:
-                raise ValueError('Unrecognized attribute filter: {}'.format(key))
+        attr_and_op_to_val = _parse_filter(kwargs)
+        predicate = _compile_predicate(
+            [(attr, operator, val) for (attr, operator), val in attr_and_op_to_val.items()])
+
+        # Narrow down items to check with indexes.
+        items = self
+        positions = self._index_positions(attr_and_op_to_val)
+        if positions is not None:
+            items = [self[pos] for pos in sorted(positions)]
 
         # Filter current to new list.
-        new_list = SmartList()
-        for item in self:
-            for key, val in attr_and_op_to_val.items():
-                attr, operator = key
-                item_val = _get_attr(item, attr)
-                if not _OPERATOR_TO_FUNC[operator](item_val, val):
-                    break
-            else:
-                new_list.append(item)
-        return new_list
+        return SmartList([item for item in items if predicate(item)])
+
+    def _index_positions(self, attr_and_op_to_val):
+        '''Set of positions of items that may match filter according to indexes. None if no
+        index can be used.
+        '''
+        candidates = None
+        for (attr, operator), val in attr_and_op_to_val.items():
+            index = self._get_index('__'.join(attr) if isinstance(attr, tuple) else attr)
+            if index is None:
+                continue
+            positions = index.lookup(operator, val)
+            if positions is None:
+                continue
+            candidates = positions if candidates is None else candidates & positions
+        return candidates
+
+
+# Relative cost of checking filter operator, for Query to check cheap conditions first.
+_OPERATOR_COST = {
+    'is': 0,
+    'is_not': 0,
+    'isnull': 0,
+    '': 1,
+    'gt': 1,
+    'gte': 1,
+    'lt': 1,
+    'lte': 1,
+    'range': 1,
+    'in': 2,
+    'not_in': 2,
+    'startswith': 2,
+    'endswith': 2,
+    'has': 3,
+    'icontains': 3,
+    'regex': 4,
+}
+# Extra cost of getting attribute with function (ie. cli_tools.compile_path()).
+_CALLABLE_ATTR_COST = 2
+
+
+class Query(object):
+    '''Lazy query of SmartList. Filters are checked together in one pass when results are read,
+    cheapest operators first, and reading stops once limit is reached.
+
+    >>> dogs.query().filter(color='white').filter(breed__in=['Samoyed']).order_by('-age').limit(2)
+    ...     .values('name')
+    ['Maya', 'Fluffy']
+
+    Because conditions are reordered, items missing an attribute may not raise ValueError like
+    SmartList.filter() does, when another condition already ruled them out.
+    '''
+
+    def __init__(self, smart_list):
+        self._list = smart_list
+        self._conditions = []  # (attr, operator, value)
+        self._order = []  # (attr, reverse)
+        self._limit = None
+
+    def _clone(self):
+        '''Copy of query, so chained calls don't change earlier queries.'''
+        query = Query(self._list)
+        query._conditions = list(self._conditions)
+        query._order = list(self._order)
+        query._limit = self._limit
+        return query
+
+    def filter(self, **kwargs):
+        '''New query also filtered by kwargs, like SmartList.filter().'''
+        query = self._clone()
+        query._conditions.extend(
+            (attr, operator, val) for (attr, operator), val in _parse_filter(kwargs).items())
+        return query
+
+    def order_by(self, *attrs):
+        '''New query sorted by attributes. Prefix attribute with "-" for descending order.'''
+        query = self._clone()
+        query._order = [
+            (attr[1:], True) if isinstance(attr, STRING_TYPES) and attr.startswith('-')
+            else (attr, False)
+            for attr in attrs]
+        return query
+
+    def limit(self, count):
+        '''New query returning at most count items.'''
+        query = self._clone()
+        query._limit = count
+        return query
+
+    def __iter__(self):
+        '''Yields matching items, in order if ordered.'''
+        items = self._matches()
+        if self._order:
+            items = self._sorted(items)
+        elif self._limit is not None:
+            items = itertools.islice(items, self._limit)
+        return iter(items)
+
+    def all(self):
+        '''Matching items as SmartList.'''
+        return SmartList(list(self))
+
+    def values(self, *attrs):
+        '''Attribute values of matching items. List of values if one attribute, else list of lists
+        like SmartList.attrs().
+        '''
+        if len(attrs) == 1:
+            return [_get_attr(item, attrs[0]) for item in self]
+        return [[_get_attr(item, attr) for attr in attrs] for item in self]
+
+    def count(self):
+        '''Number of matching items.'''
+        return sum(1 for _ in self)
+
+    def first(self):
+        '''First matching item, or None.'''
+        for item in self.limit(1):
+            return item
+
+    def _matches(self):
+        '''Yields items matching all conditions, in list order.'''
+        items = self._list
+        attr_and_op_to_val = dict(
+            ((attr, operator), val) for attr, operator, val in self._conditions)
+        positions = self._list._index_positions(attr_and_op_to_val)
+        if positions is not None:
+            items = (self._list[pos] for pos in sorted(positions))
+
+        predicate = _compile_predicate(sorted(self._conditions, key=_condition_cost))
+        for item in items:
+            if predicate(item):
+                yield item
+
+    def _sorted(self, items):
+        '''List of items sorted by order, up to limit.'''
+        directions = set(reverse for _, reverse in self._order)
+        if len(directions) == 1:
+            attrs = [attr for attr, _ in self._order]
+
+            def key(item):
+                return [_get_attr(item, attr) for attr in attrs]
+
+            reverse = directions.pop()
+            if self._limit is not None:
+                # Keeps only limit items instead of sorting all.
+                select = heapq.nlargest if reverse else heapq.nsmallest
+                return select(self._limit, items, key=key)
+            return sorted(items, key=key, reverse=reverse)
+
+        # Mixed directions. Stable sort by each attribute, last first.
+        items = list(items)
+        for attr, reverse in reversed(self._order):
+            items.sort(key=lambda item: _get_attr(item, attr), reverse=reverse)
+        return items if self._limit is None else items[:self._limit]
+
+
+def _condition_cost(condition):
+    '''Sort key of Query condition (attr, operator, value), cheapest first.'''
+    attr, operator, val = condition
+    cost = _OPERATOR_COST.get(operator, len(_OPERATOR_COST))
+    if callable(attr):
+        cost += _CALLABLE_ATTR_COST
+    elif isinstance(attr, tuple):
+        # Nested attributes.
+        cost += len(attr) - 1
+    return cost
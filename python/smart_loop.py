@@ -1,25 +1,64 @@
 '''Includes smart_loop() for running a function on a list of items and printing progress report.'''
 
+import heapq
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
 import time
 import traceback
 
+from progress import Progress
+
+try:
+    from concurrent import futures
+except ImportError:
+    # Python 2 without futures backport. Only sequential loop available.
+    futures = None
+
 
 PRE_FUNC_CALL_STR = '> Running {func_name}({item}) ({index}/{count} {percentage:.1f}%)...'
 POST_FUNC_CALL_STR = '> {func_name}({item}) took {seconds:.1f} seconds'
 ERROR_MESSAGE_STR = '> Errored while running {func_name}({item}): {error}'
 REPORT_STR = '> Ran {func_name}() on {count} items in {seconds:.1f} seconds ({successful_count}/' \
     '{count} successful)'
+RETRY_MESSAGE_STR = '> Retrying {func_name}({item}) in {seconds:.1f} seconds ' \
+    '({retry}/{retries}): {error}'
+# REPORT_STR used if retrying or timing out calls.
+RETRY_REPORT_STR = '> Ran {func_name}() on {count} items in {seconds:.1f} seconds ' \
+    '({successful_count}/{count} successful, {retry_count} retries, {timeout_count} timeouts)'
+
+THREAD = 'thread'
+PROCESS = 'process'
+ASYNC = 'async'
+# Number of concurrent calls for executor='async' if max_workers is None.
+DEFAULT_ASYNC_WORKERS = 32
+
+# Checkpoint journal is fsynced after this many results or seconds, whichever comes first.
+CHECKPOINT_SYNC_EVERY = 1000
+CHECKPOINT_SYNC_SECONDS = 1.0
+
+# Max seconds to wait before retrying call.
+MAX_BACKOFF = 60.0
 
 
 def smart_loop(func, items, pre_func_call_str=PRE_FUNC_CALL_STR, print_pre_func_call_str=True,
         post_func_call_str=POST_FUNC_CALL_STR, print_post_func_call_str=True,
         error_message_str=ERROR_MESSAGE_STR, print_error_message_str=True,
         report_str=REPORT_STR, print_report_str=True,
-        exception=Exception, stop_at_exception=True, **kwargs):
+        exception=Exception, stop_at_exception=True, executor=None, max_workers=None,
+        checkpoint=None, checkpoint_key=repr, verbose=False, retries=0, backoff=1.0,
+        max_backoff=MAX_BACKOFF, timeout=None, **kwargs):
     '''Run function with item as first argument for every item in items. Prints progress along the
     way, tracks error messages, and return results. Can also choose to stop at exception thrown
     (stop_at_exception) or continue rest of the list.
 
+    Progress is a status line redrawn up to 10 times a second (see progress.Progress), with count
+    done, throughput, ETA and errors, so printing doesn't slow down loops of many small items.
+    verbose=True prints pre_func_call_str and post_func_call_str lines for every item instead.
+
     Args:
         func (func): Function to run each item on.
         items (list): List of items to call function through.
@@ -27,11 +66,11 @@ def smart_loop(func, items, pre_func_call_str=PRE_FUNC_CALL_STR, print_pre_func_
         pre_func_call_str (str): Progress line to print before every item call. Has string
             formatting for func_name (str), item (str), index (int), count (int), and percentage
             (float).
-        print_pre_func_call_str (bool): Print pre_func_call_str if True.
+        print_pre_func_call_str (bool): Print pre_func_call_str if True and verbose.
 
         post_func_call_str (str): Progress line to print after every item call. Has string
             formatting for func_name (str), item (str), and seconds (float).
-        print_post_func_call_str (bool): Print post_func_call_str if True.
+        print_post_func_call_str (bool): Print post_func_call_str if True and verbose.
 
         error_message_str (str): Error message to print when exception thrown from function call.
             Has string formatting for func_name (str), item (str), and error (exception).
@@ -42,6 +81,9 @@ def smart_loop(func, items, pre_func_call_str=PRE_FUNC_CALL_STR, print_pre_func_
             count (int): Total number of items.
             seconds (float): Seconds the loop of calls took.
             successful_count (int): Number of calls without error raised.
+            retry_count (int): Number of calls retried.
+            timeout_count (int): Number of calls timed out.
+            Defaults to RETRY_REPORT_STR if retries or timeout.
         print_report_str (bool): Print print_report_str if True.
 
         exception (Exception): Exception to catch from function call (ie. ValueError). Note that
@@ -50,6 +92,41 @@ def smart_loop(func, items, pre_func_call_str=PRE_FUNC_CALL_STR, print_pre_func_
         stop_at_exception (bool): If True, when function call raises exception, stop iterating and
             return results up to failed call. False will continue iterating rest of the items.
 
+        executor (str or None): Run calls concurrently, up to max_workers at a time:
+            'thread': In threads. For I/O bound functions.
+            'process': In processes. Function, items, results and errors must be picklable (ie.
+                no lambdas).
+            'async': As coroutines of async function, in event loop in a background thread.
+                Python 3 only.
+            None: One at a time.
+            Progress is printed as calls start and finish, and results are still in order of
+            items. With stop_at_exception, no new calls start after one fails, calls running are
+            waited for, and results are up to earliest failed item, like without executor.
+        max_workers (int or None): Max number of calls running at once. Defaults to number of
+            CPUs for processes, CPUs + 4 (up to 32) for threads, and DEFAULT_ASYNC_WORKERS for
+            async.
+
+        checkpoint (str or None): Path of journal file to record results in as they finish. If
+            it exists, items already successful in it are skipped, so rerunning a loop that died
+            or failed partway only runs failed and remaining items. See Checkpoint.
+        checkpoint_key (func): Returns item's identity in checkpoint (str). Defaults to repr().
+
+        verbose (bool): Print lines before and after every call instead of status line.
+
+        retries (int): Number of times to retry call that raised exception or timed out before
+            counting it as failed. Retries are printed with RETRY_MESSAGE_STR if
+            print_error_message_str.
+        backoff (float): Max seconds to wait before first retry, doubled every retry of item up to
+            max_backoff. Waits random seconds up to that (full jitter), so retries of many items
+            failing at once (ie. from server overload) are spread out. Other calls keep running
+            while waiting with executor.
+        max_backoff (float): Max seconds to wait before retry.
+        timeout (float or None): Fail call if it takes longer than this many seconds. Calls run in
+            own thread (or process with executor='process', terminated on timeout), so hung calls
+            don't hold up others. Thread of timed out call is left running in background as
+            threads can't be stopped. Async calls are cancelled. Runs calls one at a time in
+            threads if executor is None.
+
         kwargs (dict): Kwargs passed to function call.
 
     Returns:
@@ -57,7 +134,57 @@ def smart_loop(func, items, pre_func_call_str=PRE_FUNC_CALL_STR, print_pre_func_
             {'successful': True, 'result': <result from function call>}
         If exception raised:
             {'successful': False, 'message': <message (string)>, 'error': <error raised>}.
+        Items skipped from checkpoint:
+            {'successful': True, 'result': <result in checkpoint>, 'checkpointed': True}
+        If retries or timeout, results also have number of 'retries' and 'timeouts' of item.
+        Timed out calls fail with concurrent.futures.TimeoutError.
     '''
+    journal = None
+    all_items = items
+    if checkpoint is not None:
+        journal = Checkpoint(checkpoint, key=checkpoint_key)
+        items = journal.pending(all_items)
+        if len(items) < len(all_items):
+            print('> Skipping {}/{} items successful in checkpoint {}'.format(
+                len(all_items) - len(items), len(all_items), checkpoint))
+
+    retry = _Retry(retries, backoff, max_backoff, timeout)
+    if retry.enabled and report_str == REPORT_STR:
+        report_str = RETRY_REPORT_STR
+    if timeout is not None and executor is None:
+        executor, max_workers = THREAD, 1
+
+    progress = None
+    if not verbose:
+        progress = Progress(len(items), func.__name__)
+        print_pre_func_call_str = print_post_func_call_str = False
+
+    loop_args = (
+        func, items, pre_func_call_str, print_pre_func_call_str, post_func_call_str,
+        print_post_func_call_str, error_message_str, print_error_message_str, report_str,
+        print_report_str, exception, stop_at_exception, journal, progress, retry, kwargs)
+    try:
+        if executor is None:
+            results = _sequential_loop(*loop_args)
+        else:
+            results = _concurrent_loop(*loop_args + (executor, max_workers))
+    finally:
+        if progress is not None:
+            progress.close()
+        if journal is not None:
+            journal.close()
+
+    if journal is not None:
+        results = journal.merge(all_items, results)
+    return results
+
+
+def _sequential_loop(
+        func, items, pre_func_call_str, print_pre_func_call_str, post_func_call_str,
+        print_post_func_call_str, error_message_str, print_error_message_str, report_str,
+        print_report_str, exception, stop_at_exception, journal, progress, retry, kwargs):
+    '''smart_loop() with calls run one at a time.'''
+    print_ = print if progress is None else progress.write
     results = []
     count = len(items)
     format_kwargs = {'func_name': func.__name__}
@@ -76,32 +203,471 @@ def smart_loop(func, items, pre_func_call_str=PRE_FUNC_CALL_STR, print_pre_func_
         # Start timer for function call on this item.
         item_start = time.time()
 
-        # Call function.
-        try:
-            res = func(item, **kwargs)
-        except exception as error:
+        # Call function, retrying if specified.
+        while True:
+            try:
+                res = func(item, **kwargs)
+            except exception as call_error:
+                error = call_error
+                error_traceback = traceback.format_exc()
+                delay = retry.failed(index)
+                if delay is None:
+                    break
+                if print_error_message_str:
+                    print_(retry.message(func.__name__, item, index, delay, error))
+                time.sleep(delay)
+            else:
+                error = None
+                break
+
+        if error is not None:
             message = error_message_str.format(error=error, **format_kwargs)
             if print_error_message_str:
-                print(message)
-            results.append({'successful': False, 'message': message, 'error': error})
+                print_(message)
+            results.append(
+                retry.annotate(index, {'successful': False, 'message': message, 'error': error}))
+            if journal is not None:
+                journal.record(item, results[-1])
+
+            if progress is not None:
+                progress.update(errors=1)
 
             # Raise exception if specified.
             if stop_at_exception:
-                traceback.print_exc()
+                if progress is not None:
+                    progress.close()
+                sys.stderr.write(error_traceback)
                 print('Returning results...')
                 return results
         else:
-            results.append({'successful': True, 'result': res})
+            results.append(retry.annotate(index, {'successful': True, 'result': res}))
             successful_count += 1
+            if journal is not None:
+                journal.record(item, results[-1])
+            if progress is not None:
+                progress.update()
 
         # Print progress after function call.
         if print_post_func_call_str:
             print(post_func_call_str.format(seconds=time.time() - item_start, **format_kwargs))
 
+    if progress is not None:
+        progress.close()
     if print_report_str:
         print(
             report_str.format(
                 func_name=func.__name__, count=count, seconds=time.time() - start,
-                successful_count=successful_count))
+                successful_count=successful_count, retry_count=retry.retry_count,
+                timeout_count=retry.timeout_count))
 
     return results
+
+
+def _concurrent_loop(
+        func, items, pre_func_call_str, print_pre_func_call_str, post_func_call_str,
+        print_post_func_call_str, error_message_str, print_error_message_str, report_str,
+        print_report_str, exception, stop_at_exception, journal, progress, retry, kwargs,
+        executor, max_workers):
+    '''smart_loop() with calls run by executor. Submits calls only while fewer than max_workers
+    are running, so each starts when submitted and progress lines print as calls start.
+    '''
+    print_ = print if progress is None else progress.write
+    pool, max_workers = _make_executor(executor, max_workers, retry.timeout)
+    count = len(items)
+    func_name = func.__name__
+    results = [None] * count
+    failed_index = None  # Earliest failed item if stopping at exception.
+    failed_traceback = {}
+    start = time.time()
+
+    items_iter = enumerate(items)
+    future_to_index = {}
+    start_times = {}
+    end_times = {}
+    retry_heap = []  # (time due, index) of items waiting to be retried.
+
+    def record_end_time(future):
+        end_times[future] = time.time()
+
+    def submit(index):
+        future = pool.submit(func, items[index], **kwargs)
+        start_times[future] = time.time()
+        future.add_done_callback(record_end_time)
+        future_to_index[future] = index
+
+    def finish(index, seconds, res=None, error=None, error_traceback=None, timed_out=False):
+        '''Record result of call, or retry it. Returns index if failed and stopping.'''
+        item_str = str(items[index])
+        if error is None:
+            results[index] = retry.annotate(index, {'successful': True, 'result': res})
+            if journal is not None:
+                journal.record(items[index], results[index])
+            if progress is not None:
+                progress.update()
+        else:
+            delay = retry.failed(index, timed_out)
+            if delay is not None:
+                if print_error_message_str:
+                    print_(retry.message(func_name, items[index], index, delay, error))
+                heapq.heappush(retry_heap, (time.time() + delay, index))
+                return None
+            message = error_message_str.format(func_name=func_name, item=item_str, error=error)
+            if print_error_message_str:
+                print_(message)
+            results[index] = retry.annotate(
+                index, {'successful': False, 'message': message, 'error': error})
+            if journal is not None:
+                journal.record(items[index], results[index])
+            if progress is not None:
+                progress.update(errors=1)
+            if stop_at_exception:
+                failed_traceback[index] = error_traceback
+                return index
+        if print_post_func_call_str:
+            print(post_func_call_str.format(func_name=func_name, item=item_str, seconds=seconds))
+        return None
+
+    try:
+        while True:
+            # Submit calls until max_workers are running, retries first once due.
+            while len(future_to_index) < max_workers:
+                if retry_heap and retry_heap[0][0] <= time.time():
+                    submit(heapq.heappop(retry_heap)[1])
+                    continue
+                if failed_index is not None:
+                    break
+                index, item = next(items_iter, (None, None))
+                if index is None:
+                    break
+                if print_pre_func_call_str:
+                    print(pre_func_call_str.format(
+                        func_name=func_name, item=str(item), index=index + 1, count=count,
+                        percentage=float(index + 1) / count * 100))
+                submit(index)
+
+            if failed_index is not None:
+                # Only retry items before earliest failed one.
+                retry_heap = [entry for entry in retry_heap if entry[1] < failed_index]
+                heapq.heapify(retry_heap)
+            if not future_to_index and not retry_heap:
+                break
+
+            # Wait for call to finish, time out, or retry to be due.
+            wait_until = []
+            if retry.timeout is not None and future_to_index:
+                wait_until.append(min(start_times.values()) + retry.timeout)
+            if retry_heap and len(future_to_index) < max_workers:
+                # Retries waiting for a free worker don't wake loop up.
+                wait_until.append(retry_heap[0][0])
+            wait_timeout = max(min(wait_until) - time.time(), 0) if wait_until else None
+            if future_to_index:
+                done, _ = futures.wait(
+                    future_to_index, timeout=wait_timeout, return_when=futures.FIRST_COMPLETED)
+            else:
+                time.sleep(wait_timeout)
+                done = ()
+
+            stopped_index = []
+            for future in sorted(done, key=future_to_index.get):
+                index = future_to_index.pop(future)
+                seconds = end_times.pop(future, time.time()) - start_times.pop(future)
+                try:
+                    res = future.result()
+                except exception as error:
+                    stopped_index.append(finish(
+                        index, seconds, error=error,
+                        error_traceback=''.join(traceback.format_exception(
+                            type(error), error, getattr(error, '__traceback__', None)))))
+                else:
+                    stopped_index.append(finish(index, seconds, res=res))
+
+            # Abandon calls taking too long.
+            if retry.timeout is not None:
+                now = time.time()
+                for future, started in list(start_times.items()):
+                    if now - started < retry.timeout or future.done():
+                        continue
+                    index = future_to_index.pop(future)
+                    del start_times[future]
+                    _abandon(pool, future)
+                    error = futures.TimeoutError('{}({}) timed out after {} seconds'.format(
+                        func_name, items[index], retry.timeout))
+                    stopped_index.append(finish(
+                        index, now - started, error=error, error_traceback=str(error) + '\n',
+                        timed_out=True))
+
+            for index in stopped_index:
+                if index is not None and (failed_index is None or index < failed_index):
+                    failed_index = index
+    finally:
+        for future in future_to_index:
+            _abandon(pool, future)
+        pool.shutdown(wait=True)
+
+    if failed_index is not None:
+        if progress is not None:
+            progress.close()
+        sys.stderr.write(failed_traceback[failed_index])
+        print('Returning results...')
+        return results[:failed_index + 1]
+
+    if progress is not None:
+        progress.close()
+    if print_report_str:
+        successful_count = sum(1 for res in results if res['successful'])
+        print(
+            report_str.format(
+                func_name=func_name, count=count, seconds=time.time() - start,
+                successful_count=successful_count, retry_count=retry.retry_count,
+                timeout_count=retry.timeout_count))
+    return results
+
+
+def _make_executor(executor, max_workers, timeout=None):
+    '''Executor for smart_loop(executor=...) and its max number of workers.'''
+    if futures is None:
+        raise ValueError('concurrent.futures not available for executor "{}"'.format(executor))
+    cpu_count = multiprocessing.cpu_count()
+    if executor == THREAD:
+        max_workers = max_workers or min(32, cpu_count + 4)
+        if timeout is not None:
+            return _CallExecutor(), max_workers
+        return futures.ThreadPoolExecutor(max_workers=max_workers), max_workers
+    if executor == PROCESS:
+        max_workers = max_workers or cpu_count
+        if timeout is not None:
+            return _CallExecutor(processes=True), max_workers
+        return futures.ProcessPoolExecutor(max_workers=max_workers), max_workers
+    if executor == ASYNC:
+        from async_tools import AsyncExecutor
+        return AsyncExecutor(), max_workers or DEFAULT_ASYNC_WORKERS
+    raise ValueError('Unrecognized executor: {}'.format(executor))
+
+
+def _abandon(pool, future):
+    '''Stop waiting for call. Cancels it if possible.'''
+    future.cancel()
+    kill = getattr(pool, 'kill', None)
+    if kill is not None:
+        kill(future)
+
+
+class _Retry(object):
+    '''Retry and timeout policy of smart_loop(), and counts of retries and timeouts.'''
+
+    def __init__(self, retries, backoff, max_backoff, timeout):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.enabled = bool(retries) or timeout is not None
+        self.retry_count = 0
+        self.timeout_count = 0
+        # Index of item to its number of retries and timeouts.
+        self._retries = {}
+        self._timeouts = {}
+
+    def failed(self, index, timed_out=False):
+        '''Count failed call of item. Returns seconds to wait before retrying it, or None if out
+        of retries.
+        '''
+        if timed_out:
+            self.timeout_count += 1
+            self._timeouts[index] = self._timeouts.get(index, 0) + 1
+        retries = self._retries.get(index, 0)
+        if retries >= self.retries:
+            return None
+        self._retries[index] = retries + 1
+        self.retry_count += 1
+        return random.uniform(0, min(self.backoff * 2 ** retries, self.max_backoff))
+
+    def message(self, func_name, item, index, seconds, error):
+        return RETRY_MESSAGE_STR.format(
+            func_name=func_name, item=item, seconds=seconds, retry=self._retries[index],
+            retries=self.retries, error=error)
+
+    def annotate(self, index, res):
+        '''Add item's number of retries and timeouts to its result dict if enabled.'''
+        if self.enabled:
+            res['retries'] = self._retries.get(index, 0)
+            res['timeouts'] = self._timeouts.get(index, 0)
+        return res
+
+
+class _CallExecutor(object):
+    '''Runs every call in its own daemon thread, or process if processes, so a call that timed
+    out can be left running (thread) or terminated (process) without holding up a worker other
+    calls need. Like concurrent.futures executors, submit() returns Future.
+    '''
+
+    def __init__(self, processes=False):
+        self.processes = processes
+        self._processes = {}  # Future to process running call.
+
+    def submit(self, func, *args, **kwargs):
+        future = futures.Future()
+        future.set_running_or_notify_cancel()
+        thread = threading.Thread(target=self._run, args=(future, func, args, kwargs))
+        thread.daemon = True
+        thread.start()
+        return future
+
+    def _run(self, future, func, args, kwargs):
+        if self.processes:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(
+                target=_send_call_result, args=(sender, func, args, kwargs))
+            process.daemon = True
+            process.start()
+            sender.close()
+            self._processes[future] = process
+            try:
+                successful, res = receiver.recv()
+            except EOFError:
+                successful, res = False, None
+            process.join()
+            self._processes.pop(future, None)
+            if res is None and not successful:
+                res = RuntimeError('Process exited with code {} before returning result'.format(
+                    process.exitcode))
+        else:
+            try:
+                successful, res = True, func(*args, **kwargs)
+            except BaseException as error:
+                successful, res = False, error
+        if successful:
+            future.set_result(res)
+        else:
+            future.set_exception(res)
+
+    def kill(self, future):
+        '''Terminate process running call, if any.'''
+        process = self._processes.pop(future, None)
+        if process is not None:
+            process.terminate()
+
+    def shutdown(self, wait=True):
+        '''Terminate processes still running. Threads still running are left in background.'''
+        for future in list(self._processes):
+            self.kill(future)
+
+
+def _send_call_result(connection, func, args, kwargs):
+    '''Call func in process and send (successful, result or error) through connection.'''
+    try:
+        res = (True, func(*args, **kwargs))
+    except BaseException as error:
+        res = (False, error)
+    connection.send(res)
+    connection.close()
+
+
+class Checkpoint(object):
+    '''Append-only journal of smart_loop() results, one JSON line per finished item:
+        {"key": <checkpoint_key(item)>, "successful": true, "result": <result>}
+        {"key": <checkpoint_key(item)>, "successful": false, "message": <error message>}
+
+    Lines are flushed and fsynced in batches (every sync_every results or sync_seconds), so
+    journaling costs little per item and a crash loses at most one batch. A line cut short by a
+    crash is ignored when loading. Results that can't be JSON serialized are saved without
+    "result", so they're None when skipped on rerun.
+
+    Args:
+        path (str): Journal file path. Created if it doesn't exist.
+        key (func): Returns item's identity (str).
+        sync_every (int): Fsync after this many results.
+        sync_seconds (float): Fsync when this many seconds passed since last fsync.
+    '''
+
+    def __init__(
+            self, path, key=repr, sync_every=CHECKPOINT_SYNC_EVERY,
+            sync_seconds=CHECKPOINT_SYNC_SECONDS):
+        self.path = path
+        self.key = key
+        self.sync_every = sync_every
+        self.sync_seconds = sync_seconds
+        # Key to result of items successful in journal.
+        self.successful = {}
+        partial_line = self._load()
+        self._file = open(path, 'a')
+        if partial_line:
+            # Start next line after line cut short.
+            self._file.write('\n')
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+    def _load(self):
+        '''Load successful results from journal. Returns True if it ends in partial line.'''
+        if not os.path.exists(self.path):
+            return False
+        line = ''
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partly written line from crash.
+                    continue
+                if entry['successful']:
+                    self.successful[entry['key']] = entry.get('result')
+        return bool(line) and not line.endswith('\n')
+
+    def pending(self, items):
+        '''Items not successful in journal. Others are skipped.'''
+        self._skipped_keys = set()
+        pending = []
+        for item in items:
+            key = self.key(item)
+            if key in self.successful:
+                self._skipped_keys.add(key)
+            else:
+                pending.append(item)
+        self._pending_count = len(pending)
+        return pending
+
+    def record(self, item, res):
+        '''Append result dict of item from smart_loop() to journal.'''
+        key = self.key(item)
+        if res['successful']:
+            self.successful[key] = res['result']
+            try:
+                line = json.dumps({'key': key, 'successful': True, 'result': res['result']})
+            except (TypeError, ValueError):
+                line = json.dumps({'key': key, 'successful': True})
+        else:
+            line = json.dumps({'key': key, 'successful': False, 'message': res['message']})
+        self._file.write(line + '\n')
+        self._unsynced += 1
+        if (self._unsynced >= self.sync_every or
+                time.time() - self._last_sync >= self.sync_seconds):
+            self.sync()
+
+    def sync(self):
+        '''Flush journal to disk.'''
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    def merge(self, items, results):
+        '''Results of items, from results of pending(items) and skipped items' results in
+        journal. Ends at last of results if loop stopped at exception.
+        '''
+        merged = []
+        stopped = len(results) < self._pending_count
+        results_iter = iter(results)
+        for item in items:
+            key = self.key(item)
+            if key in self._skipped_keys:
+                merged.append(
+                    {'successful': True, 'result': self.successful[key], 'checkpointed': True})
+                continue
+            merged.append(next(results_iter))
+            if stopped and merged[-1] is results[-1]:
+                break
+        return merged
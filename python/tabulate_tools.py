@@ -4,6 +4,7 @@ from collections import OrderedDict
 
 from tabulate import tabulate
 
+from cli_tools import compile_path
 from my_settings import MAX_LINES
 
 
@@ -45,19 +46,21 @@ def print_tabulate(
     # Sort by specified key(s.
     if sorted_key:
         if isinstance(sorted_key, list):
-            # List of keys to sort by.
-            sorted_key_func = lambda x: tuple(get(x, key) for key in sorted_key)
+            # List of keys to sort by. Compile paths once for all rows.
+            getters = [compile_path(key) for key in sorted_key]
+            sorted_key_func = lambda x: tuple(getter(x) for getter in getters)
         else:
             sorted_key_func = lambda x: x.get(sorted_key)
         dicts = sorted(dicts, key=sorted_key_func, reverse=reverse)
 
     # Filter to only specified keys in order.
     if keys:
+        key_getters = [(key, compile_path(key)) for key in keys]
         new_dicts = []
         for dict_ in dicts:
             new_dict = OrderedDict()
-            for key in keys:
-                new_dict[key] = get(dict_, key)
+            for key, getter in key_getters:
+                new_dict[key] = getter(dict_)
             new_dicts.append(new_dict)
     else:
         new_dicts = dicts
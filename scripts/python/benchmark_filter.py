@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+'''Benchmark items per second filtered by SmartList.filter(), with and without indexes.'''
+
+import argparse
+import random
+import time
+
+from smart_list import SmartList
+
+
+COLORS = ['white', 'brown', 'black', 'gold', 'grey']
+BREEDS = ['Samoyed', 'Maltese', 'Golden Retriever', 'Beagle', 'Great Dane', 'Husky']
+
+
+class Dog(object):
+    '''Dog with attributes, like ones in test_smart_list.'''
+
+    def __init__(self, name, breed, color, age, owner):
+        self.name = name
+        self.breed = breed
+        self.color = color
+        self.age = age
+        self.owner = owner
+
+
+def make_dogs(num_dogs):
+    '''SmartList of Dog objects with owner dicts.'''
+    return SmartList([
+        Dog(
+            'Dog %i' % i, random.choice(BREEDS), random.choice(COLORS), random.randint(0, 15),
+            {'name': 'Owner %i' % (i % 1000), 'city': random.choice(['Toronto', 'Paris'])})
+        for i in range(num_dogs)])
+
+
+# Label to filter() kwargs.
+FILTERS = [
+    ('color', {'color': 'white'}),
+    ('color, breed__in', {'color': 'white', 'breed__in': ['Samoyed', 'Husky']}),
+    ('name__startswith', {'name__startswith': 'Dog 12'}),
+    ('age__range', {'age__range': (3, 5)}),
+    ('age__gte', {'age__gte': 14}),
+    ('breed__icontains', {'breed__icontains': 'golden'}),
+    ('name__regex', {'name__regex': r'7$'}),
+    ('owner__city', {'owner__city': 'Paris'}),
+]
+
+
+def bench(label, dogs, kwargs):
+    '''Print items filtered per second.'''
+    start = time.time()
+    try:
+        res = dogs.filter(**kwargs)
+    except (ValueError, AttributeError, TypeError) as err:
+        print('{:<24} unsupported: {}'.format(label, err))
+        return
+    seconds = time.time() - start
+    print('{:<24} {:>8.3f}s {:>12,.0f} items/s {:>8,} matches'.format(
+        label, seconds, len(dogs) / seconds, len(res)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--num-items', type=int, default=1000000, help='Number of items. Defaults to 1M.')
+    args = parser.parse_args()
+    random.seed(0)
+    dogs = make_dogs(args.num_items)
+
+    print('Without indexes:')
+    for label, kwargs in FILTERS:
+        bench(label, dogs, kwargs)
+
+    if hasattr(dogs, 'create_index'):
+        for attr in ('color', 'name', 'age'):
+            dogs.create_index(attr)
+        print('With indexes on color, name and age:')
+        for label, kwargs in FILTERS:
+            bench(label, dogs, kwargs)
+
+
+if __name__ == '__main__':
+    main()
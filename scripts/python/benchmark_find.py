@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+'''Benchmark cli_tools find() leaf checks per second on a synthetic list of records.'''
+
+import argparse
+import re
+import time
+
+from cli_tools import InRange, _find, iter_find
+from python_compatibility import is_string
+
+
+# Leaves per synthetic record. See make_records().
+LEAVES_PER_RECORD = 10
+
+
+def make_records(num_leaves):
+    '''List of nested dict records with about num_leaves leaves in total.'''
+    records = []
+    for i in range(max(num_leaves // LEAVES_PER_RECORD, 1)):
+        records.append({
+            'id': i,
+            'name': 'record %i' % i,
+            'score': i * 0.5,
+            'active': i % 2 == 0,
+            'tags': ['alpha', 'beta', 'gamma'],
+            'owner': {'name': 'Owner %i' % (i % 100), 'email': 'owner%i@example.com' % (i % 100)},
+            'comment': None,
+        })
+    return records
+
+
+def recursive_find(haystack, needle, first, ignore_case):
+    '''Original recursive cli_tools._find(), before it was built on iter_find(). Baseline to
+    compare against.
+    '''
+    results = []
+    if isinstance(haystack, dict):
+        iterable = sorted(haystack.items())
+    elif isinstance(haystack, (list, tuple, set)):
+        iterable = enumerate(haystack)
+    else:
+        return results
+
+    for key, val in iterable:
+        # Check both key and val.
+        for item in [key, val]:
+            if isinstance(item, (dict, list, tuple, set)):
+                recursive_results = recursive_find(item, needle, first, ignore_case)
+                if recursive_results:
+                    results.extend([[key] + res for res in recursive_results])
+                    if first:
+                        return results
+                    if item == key:
+                        break
+            elif item == needle:
+                results.append([key])
+                if first:
+                    return results
+                if item == key:
+                    break
+            elif item and is_string(item) and is_string(needle):
+                if (needle.lower() in item.lower()) if ignore_case else (needle in item):
+                    results.append([key])
+                    if first:
+                        return results
+                    if item == key:
+                        break
+
+    return results
+
+
+def bench(label, func, num_leaves):
+    '''Print leaf checks per second of func().'''
+    start = time.time()
+    num_results = len(func())
+    seconds = time.time() - start
+    print('{:<40} {:>8.2f}s {:>14,.0f} leaves/s ({:,} results)'.format(
+        label, seconds, num_leaves / seconds, num_results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-l', '--leaves', type=int, default=10000000, help='Number of leaves. Defaults to 10M.')
+    parser.add_argument(
+        '-w', '--workers', type=int, nargs='+', default=[],
+        help='Also benchmark parallel search with each of these numbers of processes.')
+    args = parser.parse_args()
+
+    print('Building {:,} leaves...'.format(args.leaves))
+    records = make_records(args.leaves)
+    num_leaves = len(records) * LEAVES_PER_RECORD
+
+    # Needles that never match, so every leaf is checked.
+    bench(
+        'baseline recursive _find(), substring',
+        lambda: recursive_find(records, 'zzz', False, True), num_leaves)
+    bench('_find() sorted, substring', lambda: _find(records, 'zzz', False, True), num_leaves)
+    bench('iter_find() substring', lambda: list(iter_find(records, 'zzz')), num_leaves)
+    bench(
+        'iter_find() case-sensitive',
+        lambda: list(iter_find(records, 'zzz', ignore_case=False)), num_leaves)
+    bench('iter_find() regex', lambda: list(iter_find(records, re.compile('^zzz'))), num_leaves)
+    bench('iter_find() number', lambda: list(iter_find(records, -1)), num_leaves)
+    bench('iter_find() range', lambda: list(iter_find(records, InRange(-2, -1))), num_leaves)
+    for workers in args.workers:
+        # First call starts pool of multiprocessing_tools.get_pool(). Later calls reuse it.
+        for run in ('cold', 'warm'):
+            bench(
+                'iter_find() substring, {} workers, {}'.format(workers, run),
+                lambda: list(iter_find(records, 'zzz', workers=workers)), num_leaves)
+
+
+if __name__ == '__main__':
+    main()
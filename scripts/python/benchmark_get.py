@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+'''Benchmark per-call overhead of cli_tools get() and compile_path() accessors.'''
+
+import argparse
+import time
+
+from cli_tools import compile_path, get
+
+
+def make_rows(num_rows):
+    '''List of nested dict rows, like ones passed to tabulate_tools.print_tabulate().'''
+    return [
+        {'id': i, 'owner': {'name': 'Owner %i' % (i % 100), 'pets': [{'name': 'Pet %i' % i}]}}
+        for i in range(num_rows)]
+
+
+def bench(label, func, rows):
+    '''Print nanoseconds per call of func(row).'''
+    start = time.time()
+    for row in rows:
+        func(row)
+    seconds = time.time() - start
+    print('{:<36} {:>8.3f}s {:>8.0f} ns/call'.format(label, seconds, seconds / len(rows) * 1e9))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-r', '--rows', type=int, default=1000000, help='Number of rows. Defaults to 1M.')
+    args = parser.parse_args()
+    rows = make_rows(args.rows)
+
+    bench("get(row, 'owner pets 0 name')", lambda row: get(row, 'owner pets 0 name'), rows)
+    bench(
+        "get(row, 'owner', 'pets', 0, 'name')", lambda row: get(row, 'owner', 'pets', 0, 'name'),
+        rows)
+    get_name = compile_path('owner pets 0 name')
+    bench("compile_path('owner pets 0 name')", get_name, rows)
+
+    start = time.time()
+    sorted(rows, key=compile_path('owner name'), reverse=True)
+    print('Sorted {:,} rows by compiled path in {:.3f}s'.format(len(rows), time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
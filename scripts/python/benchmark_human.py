@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+'''Benchmark lancore batch human_times(), human_sizes() and human_ints() against scalar versions.'''
+
+import argparse
+import random
+import time
+
+from lancore import human_int, human_ints, human_size, human_sizes, human_time, human_times
+
+
+def make_values(num_values):
+    '''Durations in seconds and sizes in bytes, like ones in directory and log reports.'''
+    durations = [
+        random.choice([random.uniform(0, 1), random.uniform(1, 60), random.randint(60, 10 ** 7)])
+        for _ in range(num_values)]
+    sizes = [random.randint(0, 10 ** random.randint(1, 13)) for _ in range(num_values)]
+    return durations, sizes
+
+
+def bench(label, scalar_func, batch_func, values):
+    '''Print seconds of formatting values one at a time and in a batch.'''
+    start = time.time()
+    expected = [scalar_func(value) for value in values]
+    scalar_seconds = time.time() - start
+    start = time.time()
+    res = batch_func(values)
+    batch_seconds = time.time() - start
+    assert res == expected
+    print('{:<12} scalar {:>7.3f}s  batch {:>7.3f}s  {:>5.2f}x'.format(
+        label, scalar_seconds, batch_seconds, scalar_seconds / batch_seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-n', '--num-values', type=int, default=1000000,
+        help='Number of values. Defaults to 1M.')
+    args = parser.parse_args()
+    random.seed(0)
+    durations, sizes = make_values(args.num_values)
+
+    bench('human_time', human_time, human_times, durations)
+    bench('human_size', human_size, human_sizes, sizes)
+    bench('human_int', human_int, human_ints, sizes)
+
+
+if __name__ == '__main__':
+    main()
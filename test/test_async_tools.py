@@ -0,0 +1,49 @@
+import asyncio
+import unittest
+
+from async_tools import AsyncTimer, run_timers
+
+
+class TestAsyncTimer(unittest.TestCase):
+
+    def test_stop_on_result(self):
+        calls = []
+
+        async def poll():
+            await asyncio.sleep(0)
+            calls.append(len(calls) + 1)
+            return calls[-1]
+
+        timer = AsyncTimer(poll, 0.01, True, True, 3)
+        timer.run()
+        self.assertEqual(list(timer.results), [1, 2, 3])
+        self.assertEqual(timer.times_ran, 3)
+
+    def test_timeout_and_concurrent_timers(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        hanging = AsyncTimer(hang, 0.01, timeout=0.01)
+        counter = AsyncTimer(lambda: hanging.timeouts, 0.01, True, True, 2)
+
+        # Stop hanging timer once counter has seen two timeouts.
+        async def stop_hanging():
+            while not counter.stopped:
+                await asyncio.sleep(0.01)
+            hanging.stop()
+
+        async def main():
+            await asyncio.gather(hanging.run_async(), counter.run_async(), stop_hanging())
+
+        asyncio.run(main())
+        self.assertGreaterEqual(hanging.timeouts, 2)
+        self.assertEqual(list(hanging.results), [])
+
+    def test_run_timers(self):
+        timers = [AsyncTimer(lambda: 1, 0.01, True, True, 1) for _ in range(3)]
+        run_timers(timers)
+        self.assertEqual([timer.times_ran for timer in timers], [1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,15 @@
+import copy
+import json
+import os
+import re
+import tempfile
 import unittest
 
-from cli_tools import _find, get
+import cli_tools
+
+from cli_tools import (
+    FIXED_DELAY, MISSING, DataIndex, InRange, Scheduler, Timer, _find, compile_path, get,
+    iter_diff, iter_find, iter_find_in_json_file, list_diff_opcodes)
 
 
 EXAMPLE_DATA = {
@@ -67,6 +76,80 @@ class TestFind(unittest.TestCase):
         self.assertEqual(
             _find(EXAMPLE_DATA, 'smith', True, True), [['contacts', 'Jane Smithers']])
 
+    def test_iter_find_insertion_order(self):
+        self.assertEqual(
+            list(iter_find(EXAMPLE_DATA, 'smith')),
+            [['contacts', 'John Smith'], ['contacts', 'Jane Smithers']])
+
+    def test_iter_find_deeply_nested(self):
+        data = nested = {}
+        for _ in range(10000):
+            nested['child'] = {}
+            nested = nested['child']
+        nested['name'] = 'deep'
+        self.assertEqual(next(iter_find(data, 'deep')), ['child'] * 10000 + ['name'])
+
+    def test_find_regex(self):
+        self.assertEqual(
+            list(iter_find(EXAMPLE_DATA, re.compile(r'^(banana|lemon)$'), sort=True)),
+            [['fruits', 0, 'name'], ['fruits', 2, 'name']])
+
+    def test_find_in_range(self):
+        data = {'prices': [1.63, 2.07, 3.24, True], 'count': 2}
+        self.assertEqual(
+            list(iter_find(data, InRange(2, 3), sort=True)), [['count'], ['prices', 1]])
+
+    def test_find_workers(self):
+        records = [dict(fruit, id=i) for i in range(50) for fruit in EXAMPLE_DATA['fruits']]
+        min_items = cli_tools.PARALLEL_FIND_MIN_ITEMS
+        cli_tools.PARALLEL_FIND_MIN_ITEMS = 0
+        try:
+            self.assertEqual(
+                list(iter_find(records, 'yellow', workers=2)), list(iter_find(records, 'yellow')))
+            self.assertEqual(
+                list(iter_find(EXAMPLE_DATA, 'smith', sort=True, workers=2)),
+                _find(EXAMPLE_DATA, 'smith', False, True))
+            # Stopping early cancels chunks not started yet.
+            self.assertEqual(next(iter_find(records, 'yellow', workers=2)), [0, 'color'])
+        finally:
+            cli_tools.PARALLEL_FIND_MIN_ITEMS = min_items
+
+    def test_find_predicate(self):
+        self.assertEqual(
+            list(iter_find(EXAMPLE_DATA, lambda item: item.endswith('@gmail.com'), sort=True)),
+            [
+                ['contacts', 'Jane Smithers', 'email'],
+                ['contacts', 'John Smith', 'email'],
+            ])
+
+
+class TestFindInJsonFile(unittest.TestCase):
+
+    def setUp(self):
+        self.data = {
+            'fruits': EXAMPLE_DATA['fruits'],
+            'contacts': EXAMPLE_DATA['contacts'],
+            'countries': list(EXAMPLE_DATA['countries_tuple']),
+            'nested': [[1, [2, 'lemon']], {'empty': {}, 'yellow': [1.5, None, True]}],
+        }
+        fd, self.file_path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as fil:
+            json.dump(self.data, fil, indent=2)
+
+    def tearDown(self):
+        os.remove(self.file_path)
+
+    def test_same_paths_as_iter_find(self):
+        for needle in ['smith', 'yellow', 'lemon', 'USA', 1.5, 'narnia']:
+            self.assertEqual(
+                [path for path, _ in iter_find_in_json_file(self.file_path, needle)],
+                list(iter_find(self.data, needle)))
+
+    def test_key_match_value(self):
+        self.assertEqual(
+            list(iter_find_in_json_file(self.file_path, 'empty')),
+            [(['nested', 1, 'empty'], '{...}')])
+
 
 class TestGet(unittest.TestCase):
 
@@ -92,6 +175,174 @@ class TestGet(unittest.TestCase):
     def test_no_key(self):
         self.assertEqual(get(EXAMPLE_DATA), EXAMPLE_DATA)
 
+    def test_compile_path(self):
+        get_color = compile_path('fruits 0 color')
+        self.assertEqual(get_color(EXAMPLE_DATA), 'yellow')
+        self.assertIs(compile_path('fruits 0 color'), get_color)
+        self.assertEqual(compile_path(['countries_tuple', 3])(EXAMPLE_DATA), 'Canada')
+        self.assertEqual(
+            compile_path('contacts|John Smith|gender', delimiter='|')(EXAMPLE_DATA), 'male')
+        self.assertEqual(compile_path('narnia 0')(EXAMPLE_DATA), None)
+
+    def test_compile_path_whole_string_key(self):
+        self.assertEqual(compile_path('John Smith')(EXAMPLE_DATA['contacts'])['gender'], 'male')
+
+
+class TestDataIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.data = copy.deepcopy(EXAMPLE_DATA)
+        self.index = DataIndex(self.data)
+
+    def test_get(self):
+        self.assertEqual(self.index.get('fruits', 0, 'color'), 'yellow')
+        self.assertEqual(self.index.get('countries_tuple 3'), 'Canada')
+        self.assertEqual(self.index.get('narnia'), None)
+        self.assertEqual(self.index.get(), self.data)
+
+    def test_find_same_as_iter_find(self):
+        for needle in ['smith', 'yellow', 'Berlin', 'comment', 'n pep', '.com', 'narnia']:
+            self.assertEqual(self.index.find(needle), list(iter_find(self.data, needle)))
+
+    def test_set(self):
+        self.index.set(['fruits', 0, 'color'], 'blue')
+        self.assertEqual(self.data['fruits'][0]['color'], 'blue')
+        self.assertEqual(self.index.find('yellow'), [['fruits', 2, 'color']])
+        self.assertEqual(self.index.find('blue'), [['fruits', 0, 'color']])
+
+    def test_invalidate(self):
+        self.data['vegetables'].append({'color': 'green', 'name': 'leek'})
+        self.index.invalidate(['vegetables'])
+        self.assertEqual(self.index.get('vegetables 1 name'), 'leek')
+        self.assertEqual(self.index.find('leek'), [['vegetables', 1, 'name']])
+
+    def test_remove_new_key(self):
+        data = {'a': {'x': 'apple'}}
+        index = DataIndex(data)
+        index.set(['a', 'new'], 'banana')
+        self.assertEqual(index.find('banana'), [['a', 'new']])
+        del data['a']['new']
+        index.invalidate(['a'])
+        self.assertEqual(index.find('banana'), [])
+        self.assertEqual(len(index), 3)
+        self.assertIsNone(index.get('a new'))
+
+    def test_find_missing_ngram(self):
+        # Only some ngrams of needle are indexed.
+        self.assertEqual(self.index.find('smithzz'), [])
+        self.assertEqual(self.index.find('zzsmith'), [])
+
+    def test_invalidate_deleted_key(self):
+        self.data['vegetables'].append({'color': 'green', 'name': 'leek'})
+        self.index.invalidate(['vegetables'])
+        count = len(self.index)
+        self.data['vegetables'].pop()
+        self.index.invalidate(['vegetables', 1])
+        self.assertEqual(self.index.find('leek'), [])
+        self.assertEqual(len(self.index), count - 3)
+        self.index.invalidate(['vegetables'])
+        self.index.invalidate()
+        self.assertEqual(len(self.index), count - 3)
+        self.assertEqual(self.index.find('leek'), [])
+
+
+class TestDiff(unittest.TestCase):
+
+    def test_iter_diff_same(self):
+        self.assertEqual(list(iter_diff(EXAMPLE_DATA, copy.deepcopy(EXAMPLE_DATA))), [])
+
+    def test_iter_diff_nested(self):
+        orange = copy.deepcopy(EXAMPLE_DATA)
+        orange['fruits'][1]['color'] = 'green'
+        orange['contacts']['John Smith']['phone'] = '555-1234'
+        del orange['comment']
+        orange['countries_tuple'] = ('Afghanistan', 'Albania', 'USA')
+        self.assertEqual(
+            list(iter_diff(EXAMPLE_DATA, orange)),
+            [
+                (['fruits', 1, 'color'], 'red', 'green'),
+                (['contacts', 'John Smith', 'phone'], MISSING, '555-1234'),
+                (['comment'], 'Some comment', MISSING),
+                (['countries_tuple', 3], 'Canada', MISSING),
+            ])
+
+    def test_iter_diff_long_list(self):
+        apple = list(range(10000))
+        orange = list(apple)
+        orange[5] = -5
+        orange[9000] = [9000]
+        self.assertEqual(
+            list(iter_diff(apple, orange)), [([5], 5, -5), ([9000], 9000, [9000])])
+
+
+class TestListDiffOpcodes(unittest.TestCase):
+
+    def test_same(self):
+        self.assertEqual(list_diff_opcodes([1, 2, 3], [1, 2, 3]), [])
+        self.assertEqual(list_diff_opcodes([], []), [])
+
+    def test_insert_delete(self):
+        self.assertEqual(
+            list_diff_opcodes(['BMW', 'Toyota'], ['Mercedes', 'Toyota', 'Tesla']),
+            [('delete', 0, 1, 0, 0), ('insert', 1, 1, 0, 1), ('insert', 2, 2, 2, 3)])
+        self.assertEqual(list_diff_opcodes([], ['a', 'b']), [('insert', 0, 0, 0, 2)])
+        self.assertEqual(list_diff_opcodes(['a', 'b'], []), [('delete', 0, 2, 0, 0)])
+
+    def test_move(self):
+        self.assertEqual(
+            list_diff_opcodes(['a', 'b', 'c', 'd'], ['b', 'x', 'd', 'a']),
+            [('move', 0, 1, 3, 4), ('delete', 2, 3, 1, 1), ('insert', 3, 3, 1, 2)])
+        self.assertEqual(
+            list_diff_opcodes(['a', 'b', 'c'], ['b', 'c', 'a'], moves=False),
+            [('delete', 0, 1, 0, 0), ('insert', 3, 3, 2, 3)])
+
+    def test_duplicates_and_unhashable(self):
+        self.assertEqual(
+            list_diff_opcodes([{'a': 1}, 1, 1], [{'a': 1}, 1, {'b': 2}, 1]),
+            [('insert', 2, 2, 2, 3)])
+
+
+class Counter(object):
+    '''Callable returning how many times it was called.'''
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        return self.count
+
+
+class TestTimer(unittest.TestCase):
+
+    def test_stop_on_result(self):
+        timer = Timer(Counter(), 0.01, True, True, 3, max_history=2)
+        timer.run()
+        self.assertEqual(timer.times_ran, 3)
+        self.assertEqual(list(timer.results), [2, 3])
+        self.assertEqual(len(timer.run_times), 2)
+        self.assertEqual(timer.stats['times_ran'], 3)
+
+        # Lists if keeping all history.
+        timer = Timer(Counter(), 0.01, True, True, 3)
+        timer.run()
+        self.assertEqual(timer.results, [1, 2, 3])
+        self.assertEqual(timer.results[-2:], [2, 3])
+
+    def test_invalid_schedule(self):
+        self.assertRaises(ValueError, Timer, Counter(), 1, schedule='whenever')
+
+    def test_scheduler(self):
+        scheduler = Scheduler(max_workers=2)
+        timers = [
+            Timer(Counter(), 0.01, True, True, 2),
+            Timer(Counter(), 0.02, True, True, 3, schedule=FIXED_DELAY),
+        ]
+        for timer in timers:
+            scheduler.add(timer)
+        scheduler.run()
+        self.assertEqual([list(timer.results) for timer in timers], [[1, 2], [1, 2, 3]])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,15 @@
 import unittest
 
-from lancore import human_time
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+from lancore import (
+    human_time, benchmark, compare_benchmarks, save_benchmarks, _stats, profile_me, profile_stats,
+    reset_profile, time_me, human_size, human_sizes, human_times, human_ints,
+    similarities)
 
 
 class TestHumanTime(unittest.TestCase):
@@ -36,6 +45,9 @@ class TestHumanTime(unittest.TestCase):
         self.assertEqual(human_time(0.0000011), '1.1 microseconds')
         self.assertEqual(human_time(0.000002), '2 microseconds')
 
+    def test_nanosecond(self):
+        self.assertEqual(human_time(2.5e-7), '250 nanoseconds')
+
     def test_1(self):
         self.assertEqual(human_time(1), '1 second')
         self.assertEqual(human_time(1.0), '1 second')
@@ -99,5 +111,143 @@ class TestHumanTime(unittest.TestCase):
         self.assertEqual(human_time(31536000000), '1 millennium')
 
 
+class TestHumanBatch(unittest.TestCase):
+
+    def test_human_times(self):
+        values = [-1.5, 0, 2.5e-7, 0.1, 1, 1.5, 59, 60, 3605, 3720, 266400.5, 12345678890]
+        for decimals in (1, 2):
+            self.assertEqual(
+                human_times(values, decimals), [human_time(value, decimals) for value in values])
+        self.assertEqual(human_times([3605]), ['1 hour and 5 seconds'])
+
+    def test_human_sizes(self):
+        values = [0, 512, 999, 1000, 1024, 2048, 1.5e6, 10 ** 9, 10 ** 30]
+        for base in (1000, 1024):
+            self.assertEqual(
+                human_sizes(values, base), [human_size(value, base) for value in values])
+        self.assertEqual(human_size(2048), '2.05 kB')
+        self.assertEqual(human_size(2048, 1024), '2 KiB')
+
+    def test_human_ints(self):
+        self.assertEqual(human_ints([5, 1234567]), ['5', '1,234,567'])
+
+
+class TestSimilarities(unittest.TestCase):
+
+    def similarities(self, input_, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return similarities(input_, **kwargs)
+
+    def test_similarities(self):
+        dicts = [{'color': 'black', 'id': i} for i in range(5)] + [{'color': 'brown', 'id': 5}]
+        self.assertEqual(self.similarities(dicts), {'color': {'black': 5, 'brown': 1}})
+        self.assertEqual(self.similarities(dict(enumerate(dicts)), max_distinct=6), {
+            'color': {'black': 5, 'brown': 1}, 'id': dict((i, 1) for i in range(6))})
+
+    def test_unhashable(self):
+        dicts = [{'toys': ['ball']}, {'toys': ['ball']}, {'toys': '["ball"]'}, {'toys': {'a': 1}}]
+        res = self.similarities(iter(dicts))
+        self.assertEqual(sorted(res['toys'].values()), [1, 1, 2])
+        self.assertEqual(res['toys']['["ball"]'], 1)
+
+    def test_not_iterable(self):
+        self.assertRaises(TypeError, similarities, 'abc')
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_stats(self):
+        stats = _stats([1, 2, 3, 4, 100])
+        self.assertEqual(stats['median'], 3)
+        self.assertEqual(stats['mean'], 22)
+        self.assertEqual(stats['outliers'], 1)
+        self.assertAlmostEqual(stats['stdev'], 43.6, places=1)
+
+    def test_benchmark(self):
+        result = benchmark(sorted, [3, 2, 1], loops=10, repeat=3, name='sort')
+        self.assertEqual(result['name'], 'sort')
+        self.assertEqual(len(result['times']), 3)
+        self.assertLessEqual(result['min'], result['median'])
+
+    def test_calibrate(self):
+        result = benchmark(sorted, [3, 2, 1], repeat=2, min_time=0.01)
+        self.assertGreater(result['loops'], 1)
+
+    def test_compare(self):
+        old = {'a': {'name': 'a', 'median': 1.0, 'stdev': 0.01},
+               'b': {'name': 'b', 'median': 1.0, 'stdev': 0.5}}
+        new = {'a': {'name': 'a', 'median': 1.2, 'stdev': 0.01},
+               'b': {'name': 'b', 'median': 1.2, 'stdev': 0.5}}
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            save_benchmarks(new.values(), path)
+            # b is within noise.
+            self.assertEqual(list(compare_benchmarks(old, path)), ['a'])
+        finally:
+            os.remove(path)
+
+
+class TestTimeMeMemory(unittest.TestCase):
+
+    def test_memory(self):
+        kept = []
+
+        def allocate():
+            kept.append(bytearray(10 ** 6))
+
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        out = io.StringIO()
+        try:
+            with redirect_stdout(out):
+                time_me(allocate, n=2, memory=True, json_path=path)
+            with open(path) as fil:
+                run_memory = json.load(fil)['allocate']['memory']
+        finally:
+            os.remove(path)
+        self.assertEqual(len(run_memory), 2)
+        for mem in run_memory:
+            self.assertGreaterEqual(mem['net'], 10 ** 6)
+            self.assertGreaterEqual(mem['peak'], 10 ** 6)
+        self.assertIn('Top allocating lines:', out.getvalue())
+
+
+class TestProfileMe(unittest.TestCase):
+
+    def setUp(self):
+        reset_profile()
+
+    def tearDown(self):
+        # No report at exit.
+        reset_profile()
+
+    def test_own_time(self):
+        @profile_me
+        def inner():
+            return 1
+
+        @profile_me
+        def outer():
+            return inner() + inner()
+
+        self.assertEqual(outer(), 2)
+        name_to_result = {result['name'].split('.')[-1]: result for result in profile_stats()}
+        self.assertEqual(name_to_result['inner']['calls'], 2)
+        self.assertEqual(name_to_result['outer']['calls'], 1)
+        self.assertLess(name_to_result['outer']['own'], name_to_result['outer']['total'])
+
+    def test_sample_every(self):
+        @profile_me(sample_every=10)
+        def add(x):
+            return x + 1
+
+        for i in range(100):
+            add(i)
+        result = [result for result in profile_stats() if result['name'].endswith('add')][0]
+        self.assertEqual((result['calls'], result['sampled']), (100, 10))
+        self.assertEqual(sum(result['histogram'].values()), 10)
+
+
 if __name__ == '__main__':
     unittest.main()
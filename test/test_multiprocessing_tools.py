@@ -0,0 +1,104 @@
+import io
+import os
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from concurrent.futures.process import BrokenProcessPool
+
+from multiprocessing_tools import close_pools, get_pool, iter_func, run_func
+
+
+def square(x):
+    return x * x
+
+
+def fail_at_5(x):
+    if x == 5:
+        raise ValueError(x)
+    return x
+
+
+def exit_worker(x):
+    os._exit(1)
+
+
+def sleep(x):
+    time.sleep(0.1)
+    return x
+
+
+class TestRunFunc(unittest.TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        close_pools()
+
+    def test_iter_func(self):
+        args = (x for x in range(50))
+        self.assertEqual(
+            list(iter_func(square, args, processes=2, ordered=True, chunksize=3, max_in_flight=2)),
+            [x * x for x in range(50)])
+        self.assertEqual(
+            sorted(iter_func(square, range(50), processes=2)), [x * x for x in range(50)])
+        with self.assertRaises(ValueError):
+            list(iter_func(fail_at_5, range(10), processes=2))
+
+    def test_reads_args_lazily(self):
+        read = []
+
+        def args():
+            for x in range(1000):
+                read.append(x)
+                yield x
+
+        results = iter_func(square, args(), processes=2, ordered=True, max_in_flight=4)
+        self.assertEqual(next(results), 0)
+        self.assertLessEqual(len(read), 5)
+        results.close()
+
+    def test_run_func(self):
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(
+                run_func(square, (x for x in range(10)), processes=2, ordered=True),
+                [x * x for x in range(10)])
+            self.assertEqual(
+                run_func(fail_at_5, range(10), processes=1, ordered=True), [0, 1, 2, 3, 4])
+
+    def test_pool_reused(self):
+        self.assertIs(get_pool(2), get_pool(2))
+        pool = get_pool(2)
+        close_pools()
+        self.assertIsNot(get_pool(2), pool)
+
+    def test_broken_pool(self):
+        with self.assertRaises(BrokenProcessPool):
+            list(iter_func(exit_worker, range(4), processes=2))
+        self.assertEqual(sorted(iter_func(square, range(4), processes=2)), [0, 1, 4, 9])
+        # Pool already broken when chunks are submitted.
+        future = get_pool(2).submit(exit_worker, 0)
+        with self.assertRaises(BrokenProcessPool):
+            future.result()
+        self.assertEqual(sorted(iter_func(square, range(4), processes=2)), [0, 1, 4, 9])
+        self.assertEqual(sorted(iter_func(square, range(4), processes=2)), [0, 1, 4, 9])
+
+    def test_broken_shared_pool(self):
+        # Other caller crashing worker of shared pool doesn't fail this one.
+        results = iter_func(sleep, range(8), processes=2, ordered=True)
+        self.assertEqual(next(results), 0)
+        with self.assertRaises(BrokenProcessPool):
+            list(iter_func(exit_worker, range(2), processes=2))
+        self.assertEqual(list(results), list(range(1, 8)))
+        self.assertEqual(sorted(iter_func(square, range(4), processes=2)), [0, 1, 4, 9])
+
+    def test_close_cancels_chunks(self):
+        results = iter_func(sleep, range(100), processes=1, max_in_flight=50)
+        next(results)
+        results.close()
+        start = time.time()
+        self.assertEqual(list(iter_func(square, [3], processes=1)), [9])
+        self.assertLess(time.time() - start, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
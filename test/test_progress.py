@@ -0,0 +1,52 @@
+import io
+import unittest
+
+from progress import Progress, _clock_time
+
+
+class TtyStream(io.StringIO):
+
+    def isatty(self):
+        return True
+
+
+class TestProgress(unittest.TestCase):
+
+    def test_status(self):
+        progress = Progress(200, 'copy', stream=io.StringIO())
+        progress.update(50, errors=1)
+        status = progress.status(progress.start + 10)
+        self.assertEqual(status, '> copy: 50/200 (25.0%) 5.0/s ETA 0:30 1 error')
+        progress.count = None
+        self.assertEqual(progress.status(progress.start + 10), '> copy: 50 5.0/s 1 error')
+
+    def test_rate_limited(self):
+        stream = TtyStream()
+        with Progress(100000, stream=stream) as progress:
+            for _ in range(100000):
+                progress.update()
+        # Drawn on close, and at most 10 times a second before.
+        self.assertLess(stream.getvalue().count('\r'), 20)
+        self.assertTrue(stream.getvalue().endswith('errors\n'))
+        self.assertIn('\r> 100,000/100,000 (100.0%)', stream.getvalue())
+
+    def test_write_above_status_line(self):
+        stream = TtyStream()
+        progress = Progress(2, stream=stream)
+        progress.update()
+        progress.draw()
+        progress.write('> Errored')
+        lines = stream.getvalue().split('\n')
+        self.assertTrue(lines[0].endswith('\r> Errored'))
+        self.assertTrue(lines[1].startswith('\r> 1/2 (50.0%)'))
+        progress.close()
+        progress.close()
+        self.assertEqual(stream.getvalue().count('\n'), 2)
+
+    def test_clock_time(self):
+        self.assertEqual(_clock_time(5.4), '0:05')
+        self.assertEqual(_clock_time(3725), '1:02:05')
+
+
+if __name__ == '__main__':
+    unittest.main()
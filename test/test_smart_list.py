@@ -1,4 +1,7 @@
+import copy
+import pickle
 import unittest
+import weakref
 
 from collections import Counter
 from datetime import date
@@ -136,6 +139,254 @@ class TestFind(unittest.TestCase):
                 ['Rin Tin Tin', 'Golden Shepherd'],
             ])
 
+    def test_dogs_filter_comparisons(self):
+        # Conditions are checked in order, so None is ruled out before comparing.
+        born = DOGS.filter(birthday__isnull=False)
+        self.assertEqual(born.filter(birth_year__gt=2016), SmartList(TUCKER))
+        self.assertEqual(born.filter(birth_year__gte=2016), SmartList(MAYA, TUCKER))
+        self.assertEqual(
+            DOGS.filter(birthday__isnull=False, birth_year__range=(2015, 2017)), SmartList(MAYA))
+        self.assertRaises(TypeError, DOGS.filter, birth_year__gt=2016)
+        self.assertEqual(DOGS.filter(name__lt='M'), SmartList(LULU, FLUFFY))
+        self.assertEqual(DOGS.filter(name__lte='Lulu'), SmartList(LULU, FLUFFY))
+        self.assertEqual(DOGS.filter(name__regex=r'^S.*y$'), SmartList(SNOWY, SNOOPY))
+        self.assertEqual(DOGS.filter(breed__icontains='GOLDEN'), SmartList(TUCKER, RIN_TIN_TIN))
+        self.assertEqual(DOGS.filter(birthday__isnull=False), SmartList(MAYA, TUCKER))
+        self.assertEqual(len(DOGS.filter(ig_handle__isnull=True)), 7)
+
+    def test_filter_nested(self):
+        people = SmartList(
+            {'name': 'Ann', 'address': {'city': 'New York'}, 'pets': [{'name': 'Bo'}]},
+            {'name': 'Bob', 'address': {'city': 'York'}, 'pets': [{'name': 'Rex'}]},
+        )
+        self.assertEqual(people.filter(address__city='York').attr('name'), ['Bob'])
+        self.assertEqual(people.filter(pets__0__name__startswith='B').attr('name'), ['Ann'])
+        self.assertEqual(len(people.filter(address__city__icontains='york')), 2)
+        self.assertRaises(ValueError, people.filter, address__zip='')
+
+    def test_filter_attr_ending_like_operator(self):
+        # Operator must follow double underscore.
+        self.assertEqual(SmartList({'origin': 'x'}).filter(origin='x'), [{'origin': 'x'}])
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dogs = SmartList(list(DOGS))
+        self.dogs.create_index('color')
+        self.dogs.create_index('name')
+
+    def assertSameAsScan(self, **kwargs):
+        self.assertEqual(self.dogs.filter(**kwargs), SmartList(list(self.dogs)).filter(**kwargs))
+
+    def test_filter(self):
+        self.assertEqual(
+            self.dogs.filter(color='white', breed='Samoyed'), SmartList(FLUFFY, MAYA))
+        self.assertEqual(self.dogs.filter(color__in=['brown', None]), SmartList(SCOOBY, TUCKER))
+        self.assertEqual(self.dogs.filter(name__startswith='Sn'), SmartList(SNOWY, SNOOPY))
+        self.assertSameAsScan(color__is_not='white')
+        self.assertSameAsScan(name__in='Lulu Maya')
+        self.assertSameAsScan(name__gt='Maya')
+        self.assertSameAsScan(name__range=('L', 'R'))
+        self.assertSameAsScan(name__lte='Maya', color='white')
+
+    def test_comparisons(self):
+        records = SmartList(
+            [{'val': val} for val in [5, 1.5, None, 'a', 3, float('nan'), [1], 5, 10, 'b']])
+        records.create_index('val')
+        scan = SmartList(list(records))
+        for operator, val in [('gt', 3), ('gte', 5), ('lt', 5), ('lte', 1.5), ('gt', 'a')]:
+            kwargs = {'val__' + operator: val}
+            # Other kinds of values raise like without index.
+            self.assertRaises(TypeError, scan.filter, **kwargs)
+            self.assertRaises(TypeError, records.filter, **kwargs)
+        numbers = SmartList(list(records[:2]) + list(records[4:5]) + list(records[7:9]))
+        numbers.create_index('val')
+        self.assertEqual(numbers.filter(val__range=(2, 5)).attr('val'), [5, 3, 5])
+        self.assertEqual(numbers.filter(val__gt=5), [{'val': 10}])
+
+    def test_sync(self):
+        odie = Dog('Odie', 'Beagle', color='brown')
+        self.dogs.append(odie)
+        self.dogs[0] = Dog('Lassie', 'Collie', color='brown')
+        self.dogs.extend([Dog('Snuffles', 'Mutt', color='white')])
+        self.assertSameAsScan(color='brown')
+        self.assertSameAsScan(name__startswith='Sn')
+
+        # Moving items rebuilds index.
+        self.dogs.insert(0, odie)
+        self.dogs.sort(key=lambda dog: dog.name)
+        del self.dogs[-1]
+        self.assertSameAsScan(color='brown')
+        self.assertSameAsScan(name__startswith='Sn')
+
+    def test_pickle(self):
+        self.assertEqual(pickle.loads(pickle.dumps(SmartList([1, 2]))), SmartList([1, 2]))
+        records = SmartList([{'val': 1}, {'val': 2}])
+        records.create_index('val')
+        records.filter(val=1)
+        loaded = pickle.loads(pickle.dumps(records))
+        self.assertEqual(loaded, records)
+        self.assertEqual(loaded._indexes, {'val': None})
+        loaded.append({'val': 1})
+        self.assertEqual(loaded.filter(val=1), [{'val': 1}, {'val': 1}])
+        self.assertIsNotNone(loaded._indexes['val'])
+
+
+class TestColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.dogs = SmartList(list(DOGS))
+        self.dogs.create_columns('birth_year', 'breed', 'color')
+
+    def test_aggregates(self):
+        for dogs in (SmartList(list(DOGS)), self.dogs):
+            self.assertEqual(dogs.min('birth_year'), 2016)
+            self.assertEqual(dogs.max('birth_year'), 2018)
+            self.assertEqual(dogs.average('birth_year'), 2017.0)
+            self.assertEqual(dogs.sum('birth_year'), 4034)
+            self.assertEqual(dogs.percentile('birth_year', 50), 2017.0)
+            self.assertEqual(dogs.percentile('birth_year', 100), 2018)
+            self.assertEqual(dogs.attr_counter('color'), DOGS.attr_counter('color'))
+            self.assertIsNone(dogs.percentile('name', 50))
+
+    def test_group_by(self):
+        groups = self.dogs.group_by('breed')
+        self.assertEqual(groups['Samoyed'], SmartList(FLUFFY, MAYA))
+        self.assertEqual(list(groups)[:2], ['Maltese', 'Bichon Frise'])
+        self.assertEqual(self.dogs.group_by('color', 'birth_year', 'max'), {
+            'white': 2016, 'brown': None, 'dark sable': None, None: 2018})
+        self.assertEqual(self.dogs.group_by('color', 'birth_year', 'count')['white'], 1)
+        self.assertRaises(ValueError, self.dogs.group_by, 'color', 'birth_year', 'median')
+
+    def test_rebuild(self):
+        self.dogs.append(Dog('Puppy', 'Mutt', birthday=date(2020, 1, 1)))
+        self.assertEqual(self.dogs.max('birth_year'), 2020)
+        self.dogs[-1] = Dog('Old', 'Mutt', birthday=date(2000, 1, 1))
+        self.assertEqual(self.dogs.min('birth_year'), 2000)
+        self.dogs.pop()
+        self.assertEqual(self.dogs.min('birth_year'), 2016)
+
+    def test_pickle(self):
+        records = SmartList([{'val': 1}, {'val': 2}])
+        records.create_columns('val')
+        self.assertEqual(records.sum('val'), 3)
+        loaded = pickle.loads(pickle.dumps(records))
+        self.assertEqual(loaded._columns, {'val': None})
+        loaded.append({'val': 3})
+        self.assertEqual(loaded.sum('val'), 6)
+
+
+class TestQuery(unittest.TestCase):
+
+    def test_filter(self):
+        query = DOGS.query().filter(color='white').filter(breed__in={'Samoyed', 'Maltese'})
+        self.assertEqual(query.all(), SmartList(LULU, FLUFFY, MAYA))
+        self.assertEqual(query.values('name'), ['Lulu', 'Fluffy', 'Maya'])
+        self.assertEqual(query.count(), 3)
+        self.assertEqual(query.first(), LULU)
+        # Chaining doesn't change earlier query.
+        self.assertEqual(query.filter(name='Maya').all(), SmartList(MAYA))
+        self.assertEqual(query.count(), 3)
+
+    def test_order_and_limit(self):
+        query = DOGS.query().filter(color='white')
+        self.assertEqual(query.limit(2).all(), SmartList(LULU, QI_WAN))
+        self.assertEqual(query.order_by('-name').limit(2).values('name'), ['Snowy', 'Snoopy'])
+        self.assertEqual(
+            query.order_by('breed', '-name').values('breed', 'name')[:3],
+            [['Bichon Frise', 'QiWan'], ['Maltese', 'Lulu'], ['Samoyed', 'Maya']])
+        self.assertEqual(DOGS.query().limit(0).all(), SmartList())
+
+    def test_limit_stops_early(self):
+        checked = []
+
+        class Record(dict):
+            def __getitem__(self, key):
+                checked.append(self)
+                return dict.__getitem__(self, key)
+
+        records = SmartList([Record(id=i) for i in range(10)])
+        self.assertEqual(records.query().filter(id__in=[2, 3, 4]).limit(1).values('id'), [2])
+        # 3 records checked and 1 value read.
+        self.assertEqual(len(checked), 4)
+
+
+class TestFromDicts(unittest.TestCase):
+
+    RECORDS = [
+        {'name': 'Lulu', 'color': 'white', 'age': 3},
+        {'name': 'Scooby Doo', 'color': 'brown'},
+        {'name': 'Maya', 'color': 'white', 'age': 5},
+    ]
+
+    def test_compact(self):
+        rows = SmartList.from_dicts(iter(self.RECORDS))
+        self.assertEqual(len(rows.types), 1)
+        self.assertNotEqual(rows.types, [dict])
+        self.assertEqual(sorted(rows.keys), ['age', 'color', 'name'])
+        self.assertEqual(rows, self.RECORDS)
+        self.assertEqual(rows.filter(color='white').attr('name'), ['Lulu', 'Maya'])
+        self.assertEqual(rows.filter(color='white', age__gte=4), [self.RECORDS[2]])
+        self.assertEqual(rows.filter(color='white').max('age'), 5)
+        self.assertGreater(rows.memory_saved, 0)
+
+        row = rows[1]
+        self.assertEqual((row.name, row['color'], row.get('age')), ('Scooby Doo', 'brown', None))
+        self.assertNotIn('age', row)
+        self.assertRaises(KeyError, row.__getitem__, 'age')
+        for key in ('keys', 'items', 'get', 'to_dict', '__class__', '_fields', 1):
+            self.assertRaises(KeyError, row.__getitem__, key)
+        # Missing key raises like dicts.
+        self.assertRaises(ValueError, rows.filter, age=3)
+
+    def test_iterates_records(self):
+        class Record(dict):
+            pass
+
+        refs = []
+
+        records = [self.RECORDS[1], self.RECORDS[0], self.RECORDS[2]]
+
+        def iter_records():
+            for record in records:
+                # Records before last one read were converted and released.
+                self.assertTrue(all(ref() is None for ref in refs[:-1]))
+                record = Record(record)
+                refs.append(weakref.ref(record))
+                yield record
+
+        rows = SmartList.from_dicts(iter_records())
+        self.assertEqual(rows, records)
+        # Row class grows with new keys, for all rows.
+        self.assertEqual(rows[0].keys(), ['name', 'color'])
+        self.assertEqual(rows[1].keys(), ['name', 'color', 'age'])
+        self.assertEqual(len(rows.types), 1)
+        self.assertTrue(rows.all_same_type)
+        self.assertEqual(sorted(rows.keys), ['age', 'color', 'name'])
+        self.assertEqual(rows.filter(color='white', age__gte=4), [self.RECORDS[2]])
+
+    def test_pickle(self):
+        rows = SmartList.from_dicts(self.RECORDS)
+        for loaded in (pickle.loads(pickle.dumps(rows)), copy.deepcopy(rows)):
+            self.assertEqual(loaded, self.RECORDS)
+            self.assertIs(type(loaded[0]), type(rows[0]))
+            self.assertNotIn('age', loaded[1])
+
+    def test_not_compact(self):
+        records = [{'first name': 'Lulu'}]
+        self.assertEqual(SmartList.from_dicts(records).types, [dict])
+        self.assertEqual(SmartList.from_dicts([{'keys': 1}]).types, [dict])
+        records = self.RECORDS + [{'first name': 'Lulu'}] + self.RECORDS
+        rows = SmartList.from_dicts(iter(records))
+        self.assertEqual(rows.types, [dict])
+        self.assertEqual(rows, records)
+        self.assertEqual(rows.memory_saved, 0)
+        rows = SmartList.from_dicts(iter([{'name': 'Lulu'}, 'name']))
+        self.assertEqual(rows, [{'name': 'Lulu'}, 'name'])
+        self.assertEqual(rows.types, [dict, str])
+        self.assertEqual(SmartList.from_dicts(self.RECORDS, compact=False).types, [dict])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,241 @@
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent import futures
+from contextlib import redirect_stderr, redirect_stdout
+
+from smart_loop import Checkpoint, _Retry, smart_loop
+
+
+def double(x):
+    '''Module level so processes can pickle it.'''
+    if x == 3:
+        raise ValueError('bad {}'.format(x))
+    return x * 2
+
+
+def run_quietly(*args, **kwargs):
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        return smart_loop(*args, **kwargs)
+
+
+class TestExecutors(unittest.TestCase):
+
+    def assert_doubled(self, results, count):
+        for index, res in enumerate(results):
+            if index == 3:
+                self.assertFalse(res['successful'])
+                self.assertIsInstance(res['error'], ValueError)
+            else:
+                self.assertEqual(res, {'successful': True, 'result': index * 2})
+        self.assertEqual(len(results), count)
+
+    def test_same_results_as_sequential(self):
+        expected = run_quietly(double, list(range(8)), stop_at_exception=False)
+        self.assert_doubled(expected, 8)
+        for executor in ('thread', 'process', 'async'):
+            results = run_quietly(
+                double, list(range(8)), executor=executor, max_workers=2,
+                stop_at_exception=False)
+            self.assert_doubled(results, 8)
+
+    def test_stop_at_exception(self):
+        results = run_quietly(double, list(range(20)), executor='thread', max_workers=2)
+        self.assert_doubled(results, 4)
+
+    def test_threads_run_concurrently(self):
+        def sleep(x):
+            time.sleep(0.1)
+            return x
+
+        start = time.time()
+        results = run_quietly(sleep, list(range(8)), executor='thread', max_workers=8)
+        self.assertLess(time.time() - start, 0.5)
+        self.assertEqual([res['result'] for res in results], list(range(8)))
+
+    def test_async(self):
+        async def sleep(x):
+            await asyncio.sleep(0.1 if x % 2 else 0.01)
+            return x
+
+        start = time.time()
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            results = smart_loop(
+                sleep, list(range(20)), executor='async', max_workers=10, verbose=True)
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual([res['result'] for res in results], list(range(20)))
+        self.assertIn('> sleep(19) took 0.1 seconds', stdout.getvalue())
+        self.assertIn('(20/20 successful)', stdout.getvalue())
+
+    def test_status_line(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            smart_loop(double, list(range(5)), stop_at_exception=False)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], '> Errored while running double(3): bad 3')
+        self.assertTrue(lines[1].startswith('> double: 5/5 (100.0%) '))
+        self.assertTrue(lines[1].endswith(' 1 error'))
+        self.assertEqual(len(lines), 3)
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            smart_loop(double, [1], executor='gpu')
+
+
+def sleep_if_odd(x):
+    if x % 2:
+        time.sleep(10)
+    return x
+
+
+class TestRetry(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def tearDown(self):
+        # Let abandoned threads finish.
+        self.release.set()
+
+    def test_retries(self):
+        calls = []
+
+        def flaky(x):
+            calls.append(x)
+            if calls.count(x) < 3:
+                raise ValueError('flaky')
+            return x
+
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            results = smart_loop(flaky, [1, 2], retries=2, backoff=0.01)
+        self.assertEqual(calls, [1, 1, 1, 2, 2, 2])
+        self.assertEqual(results[1], {'successful': True, 'result': 2, 'retries': 2, 'timeouts': 0})
+        self.assertIn('> Retrying flaky(1) in ', stdout.getvalue())
+        self.assertIn('(2/2 successful, 4 retries, 0 timeouts)', stdout.getvalue())
+
+        del calls[:]
+        results = run_quietly(
+            flaky, [1, 2], retries=1, backoff=0.01, executor='thread', stop_at_exception=False)
+        self.assertEqual([res['successful'] for res in results], [False, False])
+        self.assertEqual(results[0]['retries'], 1)
+
+    def test_retry_waits_for_free_worker(self):
+        calls = []
+
+        def fail_once_or_sleep(x):
+            calls.append(x)
+            if x == 0 and calls.count(0) == 1:
+                raise ValueError('flaky')
+            time.sleep(0.5)
+            return x
+
+        # Retry of 0 is due while 1 and 2 keep both workers busy.
+        start = time.process_time()
+        results = run_quietly(
+            fail_once_or_sleep, [0, 1, 2], executor='thread', max_workers=2, retries=1,
+            backoff=0.01)
+        self.assertLess(time.process_time() - start, 0.2)
+        self.assertEqual([res['result'] for res in results], [0, 1, 2])
+        self.assertEqual(results[0]['retries'], 1)
+
+    def test_backoff(self):
+        retry = _Retry(4, 1.0, 3.0, None)
+        delays = [retry.failed(0) for _ in range(5)]
+        for delay, max_delay in zip(delays, [1, 2, 3, 3]):
+            self.assertTrue(0 <= delay <= max_delay)
+        self.assertIsNone(delays[-1])
+
+    def test_timeout(self):
+        def hang(x):
+            if x == 1:
+                self.release.wait()
+            return x
+
+        start = time.time()
+        for executor in (None, 'thread'):
+            results = run_quietly(
+                hang, [0, 1, 2], executor=executor, max_workers=1, timeout=0.1, retries=1,
+                backoff=0, stop_at_exception=False)
+            self.assertEqual(
+                results[2], {'successful': True, 'result': 2, 'retries': 0, 'timeouts': 0})
+            self.assertIsInstance(results[1]['error'], futures.TimeoutError)
+            self.assertEqual(results[1]['timeouts'], 2)
+        self.assertLess(time.time() - start, 2)
+
+    def test_timeout_terminates_process(self):
+        start = time.time()
+        results = run_quietly(
+            sleep_if_odd, [0, 1, 2, 3], executor='process', max_workers=2, timeout=0.5)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(len(results), 2)
+        self.assertIsInstance(results[1]['error'], futures.TimeoutError)
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'checkpoint.jsonl')
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def func(self, x):
+        self.calls.append(x)
+        return double(x)
+
+    def test_resume(self):
+        results = run_quietly(self.func, list(range(6)), checkpoint=self.path)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(self.calls, [0, 1, 2, 3])
+
+        # Failed item retried after skipping successful ones.
+        del self.calls[:]
+        results = run_quietly(
+            self.func, list(range(6)), checkpoint=self.path, stop_at_exception=False)
+        self.assertEqual(self.calls, [3, 4, 5])
+        self.assertEqual(results[0], {'successful': True, 'result': 0, 'checkpointed': True})
+        self.assertEqual(results[4], {'successful': True, 'result': 8})
+        self.assertFalse(results[3]['successful'])
+        self.assertEqual(len(results), 6)
+
+        del self.calls[:]
+        results = run_quietly(
+            self.func, list(range(6)), checkpoint=self.path, stop_at_exception=False,
+            executor='thread')
+        self.assertEqual(self.calls, [3])
+        self.assertEqual(results[5], {'successful': True, 'result': 10, 'checkpointed': True})
+
+    def test_stop_at_exception_after_skipped(self):
+        run_quietly(self.func, [0, 1], checkpoint=self.path)
+        results = run_quietly(self.func, [3, 0, 4, 1], checkpoint=self.path)
+        self.assertEqual(len(results), 1)
+        results = run_quietly(self.func, [0, 3, 1, 4], checkpoint=self.path)
+        self.assertEqual(len(results), 2)
+
+    def test_truncated_line_and_unserializable_result(self):
+        checkpoint = Checkpoint(self.path, sync_every=1)
+        checkpoint.record('a', {'successful': True, 'result': object()})
+        checkpoint.record('b', {'successful': True, 'result': [1, 2]})
+        checkpoint.close()
+        with open(self.path, 'a') as f:
+            f.write('{"key": "\'c\'", "succ')
+
+        checkpoint = Checkpoint(self.path)
+        self.assertEqual(checkpoint.successful, {"'a'": None, "'b'": [1, 2]})
+        self.assertEqual(checkpoint.pending(['a', 'b', 'c']), ['c'])
+        checkpoint.record('c', {'successful': True, 'result': 3})
+        checkpoint.close()
+        self.assertEqual(Checkpoint(self.path).successful["'c'"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()